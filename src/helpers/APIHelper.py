@@ -1,104 +1,213 @@
 import random
-from datetime import datetime
+import time
+from collections import deque
 
-import requests
-from faker import Faker
-from faker.providers import internet
-from jsonschema.validators import validate
 from requests.auth import HTTPBasicAuth
 
-from src.utilities import utilities
+from src.helpers.DataFactory import get_data_factory
+from src.helpers import Cassette, ResourceRegistry, ResponseCache
+from src.helpers.HTTPTransport import get_transport
+from src.utilities import api_metrics, settings, streaming, utilities
+from src.utilities.schema_registry import get_schema_registry
 
 
 # Helper class for API tests
 class APIHelper:
     def __init__(self):
+        api_settings = settings.get_settings().api
         # Urls
-        self.api_base_url = utilities.read_configs("api", "api_base_url")
+        self.api_base_url = api_settings.api_base_url
         self.pet_url = f"{self.api_base_url}/pet"
         self.pet_find_by_status_url = f"{self.api_base_url}/pet/findByStatus"
         self.order_url = f"{self.api_base_url}/store/order"
         self.inventory_url = f"{self.api_base_url}/store/inventory"
 
         # Values
-        self.api_key = utilities.read_env_variables("api_key")
+        self.api_key = api_settings.api_key
         self.pet_statuses = ["available", "pending", "sold"]
         self.order_statuses = ["placed", "approved", "delivered"]
         self.expected_content_type = "application/json"
 
-        # Library to generate random data
-        self.fake = Faker()
-        self.fake.add_provider(internet)
+        # Shared connection-pooled transport of the current worker
+        self.transport = get_transport()
+
+        # Seeded payload factory of the running test
+        self.data_factory = get_data_factory()
+
+        # Polling policy for eventually consistent endpoints
+        self.poll_timeout = utilities.read_float_config("polling", "timeout")
+        self.poll_initial_delay = utilities.read_float_config("polling", "initial_delay")
+        self.poll_max_delay = utilities.read_float_config("polling", "max_delay")
+        self.poll_backoff = utilities.read_float_config("polling", "backoff")
+        self.poll_jitter = utilities.read_float_config("polling", "jitter")
+        # Own random so the number of polls does not change the seeded test data
+        self.poll_random = random.Random()
+        # Replayed responses never change while waiting, polls follow the recorded ones without sleeping
+        if Cassette.get_mode() == "replay":
+            self.poll_initial_delay = self.poll_max_delay = 0.0
 
     # HTTPS Request Methods
     def get_pets_by_status(self, status, expected_status_code):
         params = {"status": status}
-        response = requests.get(url=self.pet_find_by_status_url, params=params)
+        response = self.cached_get(self.pet_find_by_status_url, "get_pets_by_status", ("pet_list",), params)
 
         # Check expected status code, content-type header and json schema for each request
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        self.assert_schema(response, utilities.read_get_pets_schema())
-        return response.json()
+        response_json = self.parse_json(response)
+        self.assert_schema(response_json, "get_pets_schema")
+        return response_json
+
+    # Streaming variant for large lists, pets are parsed and validated one by one as the response arrives
+    def iter_pets_by_status(self, status, expected_status_code):
+        response = self.transport.get(url=self.pet_find_by_status_url, params={"status": status}, stream=True,
+                                      operation="iter_pets_by_status")
+        self.assert_status_code(response, expected_status_code)
+        self.assert_content_type(response, self.expected_content_type)
+        validate_pet = get_schema_registry().get_item_validator("get_pets_schema")
+        for index, pet in enumerate(streaming.iter_json_array(response)):
+            with api_metrics.timed_phase("schema_validation"):
+                validate_pet(pet, index)
+            yield pet
+
+    # Pick k random pets in one pass over the streamed list, returns fewer if the list is shorter
+    def sample_pets_by_status(self, status, k, expected_status_code):
+        return streaming.reservoir_sample(self.iter_pets_by_status(status, expected_status_code), k)
 
     def get_inventory(self, expected_status_code):
-        response = requests.get(url=self.inventory_url)
+        response = self.cached_get(self.inventory_url, "get_inventory", ("inventory",))
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        self.assert_schema(response, utilities.read_get_inventory_schema())
-        return response.json()
+        response_json = self.parse_json(response)
+        self.assert_schema(response_json, "get_inventory_schema")
+        return response_json
 
     def get_pet_by_id(self, pet_id, expected_status_code):
-        response = requests.get(url=self.pet_url + f"/{pet_id}")
+        response = self.cached_get(self.pet_url + f"/{pet_id}", "get_pet_by_id", (f"pet:{pet_id}",))
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        if "id" in response.json():
-            self.assert_schema(response, utilities.read_get_pet_schema())
+        response_json = self.parse_json(response)
+        if "id" in response_json:
+            self.assert_schema(response_json, "get_pet_schema")
         else:
-            self.assert_schema(response, utilities.read_error_message_schema())
-        return response.json()
+            self.assert_schema(response_json, "error_response_schema")
+        return response_json
 
     def get_order_by_id(self, order_id, expected_status_code):
-        response = requests.get(url=self.order_url + f"/{order_id}")
+        response = self.cached_get(self.order_url + f"/{order_id}", "get_order_by_id", (f"order:{order_id}",))
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
         # Expected json schema changes if ID is correct or not
-        if "id" in response.json():
-            self.assert_schema(response, utilities.read_get_order_schema())
+        response_json = self.parse_json(response)
+        if "id" in response_json:
+            self.assert_schema(response_json, "get_order_schema")
         else:
-            self.assert_schema(response, utilities.read_error_message_schema())
-        return response.json()
+            self.assert_schema(response_json, "error_response_schema")
+        return response_json
 
     def post_update_pet_by_id(self, pet_id, name, status, expected_status_code):
         pet_data = {"name": name, "status": status}
-        response = requests.post(url=self.pet_url + f"/{pet_id}", data=pet_data)
+        response = self.transport.post(url=self.pet_url + f"/{pet_id}", data=pet_data,
+                                       operation="post_update_pet_by_id")
+        self.invalidate_cache("pet_list", "inventory", f"pet:{pet_id}")
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        if "id" in response.json():
-            self.assert_schema(response, utilities.read_post_pet_schema())
+        response_json = self.parse_json(response)
+        if "id" in response_json:
+            self.assert_schema(response_json, "post_pet_schema")
         else:
-            self.assert_schema(response, utilities.read_error_message_schema())
+            self.assert_schema(response_json, "error_response_schema")
 
     def post_add_pet(self, json_payload, expected_status_code):
-        response = requests.post(url=self.pet_url, json=json_payload)
+        response = self.transport.post(url=self.pet_url, json=json_payload, operation="post_add_pet")
+        self.invalidate_cache("pet_list", "inventory")
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        self.assert_schema(response, utilities.read_get_pet_schema())
-        return response.json()
+        response_json = self.parse_json(response)
+        # A not found answer for the new id may be cached
+        if isinstance(response_json, dict) and "id" in response_json:
+            self.invalidate_cache(f"pet:{response_json['id']}")
+        # Track the new pet before validating it so it is deleted at teardown even if the test fails
+        self.register_created_resource(response_json, "pet", "post_add_pet")
+        self.assert_schema(response_json, "get_pet_schema")
+        return response_json
 
     def post_place_order(self, json_payload, expected_status_code):
-        response = requests.post(url=self.order_url, json=json_payload)
+        response = self.transport.post(url=self.order_url, json=json_payload, operation="post_place_order")
+        self.invalidate_cache("inventory")
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
-        self.assert_schema(response, utilities.read_get_order_schema())
-        return response.json()
+        response_json = self.parse_json(response)
+        if isinstance(response_json, dict) and "id" in response_json:
+            self.invalidate_cache(f"order:{response_json['id']}")
+        self.register_created_resource(response_json, "order", "post_place_order")
+        self.assert_schema(response_json, "get_order_schema")
+        return response_json
 
     def delete_pet_by_id(self, pet_id, expected_status_code):
         api_auth = HTTPBasicAuth("apikey", self.api_key)
-        response = requests.delete(url=self.pet_url + f"/{pet_id}", auth=api_auth)
+        response = self.transport.delete(url=self.pet_url + f"/{pet_id}", auth=api_auth,
+                                         operation="delete_pet_by_id")
+        self.unregister_deleted_resource(response, "pet", pet_id)
         self.assert_status_code(response, expected_status_code)
         self.assert_content_type(response, self.expected_content_type)
 
+    def delete_order_by_id(self, order_id, expected_status_code):
+        response = self.transport.delete(url=self.order_url + f"/{order_id}", operation="delete_order_by_id")
+        self.unregister_deleted_resource(response, "order", order_id)
+        self.assert_status_code(response, expected_status_code)
+        self.assert_content_type(response, self.expected_content_type)
+
+    # Delete a tracked resource at teardown without assertions, returns the status code
+    def delete_resource(self, kind, resource_id):
+        if kind == "pet":
+            response = self.transport.delete(url=self.pet_url + f"/{resource_id}",
+                                             auth=HTTPBasicAuth("apikey", self.api_key), operation="cleanup_pet")
+        else:
+            response = self.transport.delete(url=self.order_url + f"/{resource_id}", operation="cleanup_order")
+        self.invalidate_cache("pet_list", "inventory", f"{kind}:{resource_id}")
+        return response.status_code
+
+    @staticmethod
+    def register_created_resource(response_json, kind, created_by):
+        if isinstance(response_json, dict) and "id" in response_json:
+            ResourceRegistry.get_resource_registry().register(kind, response_json["id"], created_by)
+
+    # Resources deleted by the test itself are not deleted again at teardown
+    def unregister_deleted_resource(self, response, kind, resource_id):
+        self.invalidate_cache("pet_list", "inventory", f"{kind}:{resource_id}")
+        if response.status_code in (200, 404):
+            ResourceRegistry.get_resource_registry().unregister(kind, resource_id)
+            ResourceRegistry.get_session_registry().unregister(kind, resource_id)
+
+    # Read-through cache of GET responses, the request is always sent when the cache is disabled or bypassed
+    def cached_get(self, url, operation, tags, params=None):
+        cache = ResponseCache.get_response_cache()
+        if cache is None:
+            return self.transport.get(url=url, params=params, operation=operation)
+        key = (url, tuple(sorted((params or {}).items())))
+        cached_response = cache.get(key)
+        if cached_response is not None:
+            api_metrics.clear_current_record()
+            return cached_response
+        fetch_generation = cache.start_fetch()
+        response = self.transport.get(url=url, params=params, operation=operation)
+        if response.status_code < 500:
+            cache.put(key, ResponseCache.CachedResponse.from_response(response), tags, fetch_generation)
+        return response
+
+    # Drop cached responses a mutation may have changed
+    @staticmethod
+    def invalidate_cache(*tags):
+        cache = ResponseCache.get_response_cache()
+        if cache is not None:
+            cache.invalidate(*tags)
+
+    # Send the requests of the block to the backend even if their responses are cached, for freshness checks
+    @staticmethod
+    def bypass_cache():
+        return ResponseCache.bypass()
+
     # General Methods
     @staticmethod
     def assert_status_code(response, expected_status_code):
@@ -108,24 +217,53 @@ class APIHelper:
     def assert_content_type(response, expected_content_type):
         assert response.headers["content-type"] == expected_content_type
 
+    # Call request until predicate holds on its result, with exponential backoff and jitter between attempts.
+    # Failed assertions inside request count as attempts, the last observed values are reported on timeout
+    def poll_until(self, request, predicate, description="condition", timeout=None, history_size=10):
+        timeout = self.poll_timeout if timeout is None else timeout
+        history = deque(maxlen=history_size)
+        start = time.perf_counter()
+        delay = self.poll_initial_delay
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                # Every attempt has to reach the backend, a cached response would never converge
+                with self.bypass_cache():
+                    value = request()
+                if predicate(value):
+                    return value
+                history.append((attempt, time.perf_counter() - start, repr(value)))
+            except AssertionError as error:
+                history.append((attempt, time.perf_counter() - start, f"{type(error).__name__}: {error}"))
+            remaining = timeout - (time.perf_counter() - start)
+            if remaining <= 0:
+                raise PollTimeoutError(description, timeout, attempt, history)
+            jittered_delay = delay * self.poll_random.uniform(1 - self.poll_jitter, 1 + self.poll_jitter)
+            time.sleep(min(jittered_delay, remaining))
+            delay = min(delay * self.poll_backoff, self.poll_max_delay)
+
+    # Validate already parsed response json against a precompiled schema from src/data/schemas
+    @staticmethod
+    def assert_schema(response_json, schema_name):
+        schema_registry = get_schema_registry()
+        with api_metrics.timed_phase("schema_validation"):
+            schema_registry.validate(response_json, schema_name)
+
     @staticmethod
-    def assert_schema(response, schema):
-        validate(instance=response.json(), schema=schema)
+    def parse_json(response):
+        with api_metrics.timed_phase("json_parse"):
+            return response.json()
 
+    # Build test data from the templates in src/data/test_data/payload_templates.json
     def generate_random_date(self, data_type, **kwargs):
-        if data_type == "pet_name":
-            return self.fake.first_name()
-        elif data_type == "pet_status":
-            return random.choice([status for status in self.pet_statuses])
-        elif data_type == "pet_payload":
-            return {"name": self.fake.first_name(),
-                    "photoUrls": [self.fake.image_url()],
-                    "status": "available"}
-        elif data_type == "order_payload":
-            return {"petId": kwargs["pet_id"],
-                    "quantity": random.randint(1, 5),
-                    "shipDate": datetime.now().isoformat(),
-                    "status": random.choice([status for status in self.order_statuses]),
-                    "complete": random.choice([True, False])}
-        else:
-            return ""
+        return self.data_factory.build(data_type, **kwargs)
+
+
+# Raised when an eventually consistent endpoint did not converge in time, fails the test like an assertion
+class PollTimeoutError(AssertionError):
+    def __init__(self, description, timeout, attempts, history):
+        self.history = list(history)
+        observed = "\n".join(f"  attempt {attempt} at {elapsed:.2f}s: {value}" for attempt, elapsed, value in history)
+        super().__init__(f"Timed out after {timeout}s and {attempts} attempts waiting for {description}, "
+                         f"last observed values:\n{observed}")
@@ -0,0 +1,94 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.helpers.APIHelper import APIHelper
+from src.utilities import utilities
+
+
+# Helper class running APIHelper requests concurrently on an event loop
+class AsyncAPIHelper:
+    def __init__(self, api_helper=None):
+        # Requests, assertions and schema validation are delegated to the sync helper
+        self.api_helper = api_helper or APIHelper()
+        self.executor = get_executor()
+
+    # HTTPS Request Methods
+    async def get_pets_by_status(self, status, expected_status_code):
+        return await self._run(self.api_helper.get_pets_by_status, status, expected_status_code)
+
+    async def get_inventory(self, expected_status_code):
+        return await self._run(self.api_helper.get_inventory, expected_status_code)
+
+    async def get_pet_by_id(self, pet_id, expected_status_code):
+        return await self._run(self.api_helper.get_pet_by_id, pet_id, expected_status_code)
+
+    async def get_order_by_id(self, order_id, expected_status_code):
+        return await self._run(self.api_helper.get_order_by_id, order_id, expected_status_code)
+
+    async def post_update_pet_by_id(self, pet_id, name, status, expected_status_code):
+        return await self._run(self.api_helper.post_update_pet_by_id, pet_id, name, status, expected_status_code)
+
+    async def post_add_pet(self, json_payload, expected_status_code):
+        return await self._run(self.api_helper.post_add_pet, json_payload, expected_status_code)
+
+    async def post_place_order(self, json_payload, expected_status_code):
+        return await self._run(self.api_helper.post_place_order, json_payload, expected_status_code)
+
+    async def delete_pet_by_id(self, pet_id, expected_status_code):
+        return await self._run(self.api_helper.delete_pet_by_id, pet_id, expected_status_code)
+
+    async def delete_order_by_id(self, order_id, expected_status_code):
+        return await self._run(self.api_helper.delete_order_by_id, order_id, expected_status_code)
+
+    # Batch Methods, results are returned in the same order as the input
+    async def get_pets_by_ids(self, pet_ids, expected_status_code):
+        return await asyncio.gather(*[self.get_pet_by_id(pet_id, expected_status_code) for pet_id in pet_ids])
+
+    async def get_orders_by_ids(self, order_ids, expected_status_code):
+        return await asyncio.gather(*[self.get_order_by_id(order_id, expected_status_code)
+                                      for order_id in order_ids])
+
+    async def add_pets(self, json_payloads, expected_status_code):
+        return await asyncio.gather(*[self.post_add_pet(json_payload, expected_status_code)
+                                      for json_payload in json_payloads])
+
+    async def place_orders(self, json_payloads, expected_status_code):
+        return await asyncio.gather(*[self.post_place_order(json_payload, expected_status_code)
+                                      for json_payload in json_payloads])
+
+    async def delete_pets(self, pet_ids, expected_status_code):
+        return await asyncio.gather(*[self.delete_pet_by_id(pet_id, expected_status_code) for pet_id in pet_ids])
+
+    # General Methods
+    # Run independent requests together from sync code and return their results in order
+    @staticmethod
+    def run(*coroutines):
+        async def gather_all():
+            return await asyncio.gather(*coroutines)
+        return asyncio.run(gather_all())
+
+    def generate_random_date(self, data_type, **kwargs):
+        return self.api_helper.generate_random_date(data_type, **kwargs)
+
+    async def _run(self, method, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, *args))
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+# Worker threads shared by all async helpers of the current worker, their number bounds concurrency
+def get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            max_concurrency = utilities.read_int_config("async_api", "max_concurrency")
+            _executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="async-api")
+            _executor_pid = os.getpid()
+        return _executor
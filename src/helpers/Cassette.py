@@ -0,0 +1,309 @@
+import io
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from src.utilities import api_metrics, settings, utilities
+
+CASSETTE_VERSION = 1
+CASSETTES_PATH = os.path.join(settings.DATA_PATH, "cassettes")
+# Seed of the test data the cassettes were recorded with, replays must build the same payloads
+SEED_FILE_PATH = os.path.join(CASSETTES_PATH, "seed.json")
+MODES = ("off", "record", "replay", "verify")
+# Request fields match_on can compare
+MATCHERS = ("method", "path", "query", "body")
+# Response headers kept in cassettes, the others only add size
+KEPT_RESPONSE_HEADERS = ("Content-Type",)
+REDACTED = "REDACTED"
+# Drifts shown per exchange, the rest are counted
+MAX_DRIFT_DETAILS = 5
+
+
+# Raised when a request has no recorded exchange, never an AssertionError so poll_until does not retry it
+class CassetteError(Exception):
+    pass
+
+
+# Recorded request and response exchanges of one test.
+# record: requests go to the API and exchanges are saved when the test ends
+# replay: exchanges are served from the file, nothing is sent
+# verify: requests go to the API and each response is compared with its recorded one, differences are drifts
+class Cassette:
+    def __init__(self, path, mode, match_on, redacted_fields, seed=None):
+        self.path = path
+        self.mode = mode
+        self.match_on = tuple(match_on)
+        unknown_fields = set(self.match_on) - set(MATCHERS)
+        if unknown_fields:
+            raise ValueError(f"Unknown cassette match_on fields: {sorted(unknown_fields)}, use any of {MATCHERS}")
+        self.redacted_fields = frozenset(redacted_fields)
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.used = []
+        self.drifts = []
+        self.requests_served = 0
+        self.missing = mode != "record" and not os.path.exists(path)
+        if mode != "record" and not self.missing:
+            self.load()
+
+    def load(self):
+        with open(self.path) as cassette_file:
+            cassette = json.load(cassette_file)
+        if cassette.get("version") != CASSETTE_VERSION:
+            raise CassetteError(f"Cassette {self.path} has version {cassette.get('version')}, "
+                                f"expected {CASSETTE_VERSION}, record it again with --cassette record")
+        if self.seed is not None and cassette.get("seed") != self.seed:
+            raise CassetteError(f"Cassette {self.path} was recorded with test data seed {cassette.get('seed')} "
+                                f"but this run uses {self.seed}, record it again with --cassette record")
+        self.interactions = cassette["interactions"]
+        self.used = [False] * len(self.interactions)
+
+    # Requests Methods, called by CassetteAdapter from any thread of the test
+    def play(self, prepared_request):
+        recorded_request = self.describe_request(prepared_request)
+        interaction = self.next_interaction(recorded_request, self.match_on)
+        if interaction is None and self.missing:
+            raise CassetteError(f"Cassette {self.path} does not exist, record it with --cassette record")
+        if interaction is None:
+            raise CassetteError(f"No unused exchange in {self.path} matches {prepared_request.method} "
+                                f"{prepared_request.path_url} on {', '.join(self.match_on)}, "
+                                f"record it again with --cassette record")
+        return build_response(prepared_request, interaction["response"])
+
+    def record(self, prepared_request, response):
+        interaction = {"request": self.describe_request(prepared_request),
+                       "response": self.describe_response(response)}
+        with self.lock:
+            self.interactions.append(interaction)
+            self.requests_served += 1
+
+    # Live ids differ from recorded ones, exchanges are paired by method and endpoint in recorded order
+    def verify(self, prepared_request, response):
+        recorded_request = self.describe_request(prepared_request)
+        recorded_request["endpoint"] = api_metrics.get_endpoint_template(recorded_request["path"])
+        interaction = self.next_interaction(recorded_request, ("method", "endpoint"))
+        exchange = f"{prepared_request.method} {recorded_request['endpoint']}"
+        if interaction is None:
+            drifts = ["no recorded exchange"]
+        else:
+            drifts = get_response_drifts(interaction["response"], self.describe_response(response))
+        if drifts:
+            with self.lock:
+                self.drifts.append({"exchange": exchange, "drifts": drifts})
+
+    def next_interaction(self, recorded_request, match_on):
+        with self.lock:
+            candidates = [index for index, interaction in enumerate(self.interactions)
+                          if not self.used[index] and all(self.get_request_field(interaction["request"], field)
+                                                          == recorded_request[field] for field in match_on)]
+            if not candidates:
+                return None
+            # Concurrent requests to the same endpoint get the exchange recorded with the same body if there is one
+            index = next((index for index in candidates
+                          if self.interactions[index]["request"]["body"] == recorded_request["body"]), candidates[0])
+            self.used[index] = True
+            self.requests_served += 1
+            return self.interactions[index]
+
+    @staticmethod
+    def get_request_field(recorded_request, field):
+        if field == "endpoint":
+            return api_metrics.get_endpoint_template(recorded_request["path"])
+        return recorded_request[field]
+
+    # Method, path, query and body of a request. Headers are never saved so the api_key basic auth of
+    # delete_pet_by_id stays out of cassettes, redacted fields are replaced in query and body
+    def describe_request(self, prepared_request):
+        url = urlsplit(prepared_request.url)
+        query = sorted(parse_qsl(url.query, keep_blank_values=True))
+        body = prepared_request.body
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        content_type = prepared_request.headers.get("Content-Type", "")
+        if body and "json" in content_type:
+            body = self.redact(json.loads(body))
+        elif body and "x-www-form-urlencoded" in content_type:
+            body = urlencode(self.redact_pairs(parse_qsl(body, keep_blank_values=True)))
+        return {"method": prepared_request.method,
+                "path": url.path,
+                "query": urlencode(self.redact_pairs(query)),
+                "body": body or None}
+
+    def describe_response(self, response):
+        recorded_response = {"status": response.status_code,
+                             "reason": response.reason,
+                             "headers": {header: response.headers[header] for header in KEPT_RESPONSE_HEADERS
+                                         if header in response.headers}}
+        try:
+            recorded_response["json"] = self.redact(json.loads(response.content))
+        except ValueError:
+            recorded_response["text"] = response.content.decode(response.encoding or "utf-8", errors="replace")
+        return recorded_response
+
+    def redact(self, value):
+        if isinstance(value, dict):
+            return {key: REDACTED if key in self.redacted_fields else self.redact(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.redact(item) for item in value]
+        return value
+
+    def redact_pairs(self, pairs):
+        return [(key, REDACTED if key in self.redacted_fields else value) for key, value in pairs]
+
+    # Save recorded exchanges, one compact json file per test
+    def save(self):
+        with self.lock:
+            cassette = {"version": CASSETTE_VERSION,
+                        "seed": self.seed,
+                        "match_on": list(self.match_on),
+                        "interactions": self.interactions}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_file_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temporary_file_path, "w") as cassette_file:
+            json.dump(cassette, cassette_file, separators=(",", ":"))
+        os.replace(temporary_file_path, self.path)
+
+    # Counters of the test for the run summary, exchanges recorded but never replayed are drifts as well
+    def summary(self):
+        with self.lock:
+            drifts = list(self.drifts)
+            unused = self.used.count(False)
+        if unused and self.mode in ("replay", "verify"):
+            drifts.append({"exchange": "cassette", "drifts": [f"{unused} recorded exchanges were not requested"]})
+        return {"mode": self.mode, "requests": self.requests_served, "drifts": drifts}
+
+
+# Requests adapter sending requests through the active cassette, requests outside tests go to the network
+# except in replay mode
+class CassetteAdapter(HTTPAdapter):
+    def send(self, request, **kwargs):
+        cassette = get_active_cassette()
+        if cassette is None:
+            if get_mode() == "replay":
+                raise CassetteError(f"No cassette is active to replay {request.method} {request.path_url}")
+            return super().send(request, **kwargs)
+        if cassette.mode == "replay":
+            return cassette.play(request)
+        response = super().send(request, **kwargs)
+        # Body is read here to be saved or compared, callers streaming it read it from memory
+        response.content
+        if cassette.mode == "record":
+            cassette.record(request, response)
+        else:
+            cassette.verify(request, response)
+        return response
+
+
+# Response served from a recorded exchange, streamed reads go through the in-memory body
+def build_response(prepared_request, recorded_response):
+    response = requests.Response()
+    response.status_code = recorded_response["status"]
+    response.reason = recorded_response.get("reason")
+    response.headers = CaseInsensitiveDict(recorded_response["headers"])
+    if "json" in recorded_response:
+        body = json.dumps(recorded_response["json"]).encode()
+    else:
+        body = recorded_response["text"].encode()
+    response.raw = io.BytesIO(body)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response.url = prepared_request.url
+    response.request = prepared_request
+    return response
+
+
+# Differences of status code and json structure, values are expected to differ between runs
+def get_response_drifts(recorded_response, live_response):
+    drifts = []
+    if recorded_response["status"] != live_response["status"]:
+        drifts.append(f"status {recorded_response['status']} recorded, {live_response['status']} live")
+    recorded_shape = get_json_shape(recorded_response.get("json"))
+    live_shape = get_json_shape(live_response.get("json"))
+    missing, added = sorted(recorded_shape - live_shape), sorted(live_shape - recorded_shape)
+    for label, fields in (("missing", missing), ("new", added)):
+        if fields:
+            details = ", ".join(fields[:MAX_DRIFT_DETAILS])
+            more = f" and {len(fields) - MAX_DRIFT_DETAILS} more" if len(fields) > MAX_DRIFT_DETAILS else ""
+            drifts.append(f"{label} fields: {details}{more}")
+    return drifts
+
+
+# Set of "path:type" of every value in a json document, list items share the path "[]"
+def get_json_shape(value, path="$", shape=None):
+    shape = set() if shape is None else shape
+    if isinstance(value, dict):
+        shape.add(f"{path}:object")
+        for key, item in value.items():
+            get_json_shape(item, f"{path}.{key}", shape)
+    elif isinstance(value, list):
+        shape.add(f"{path}:array")
+        for item in value:
+            get_json_shape(item, f"{path}[]", shape)
+    elif value is not None:
+        json_type = "number" if isinstance(value, (int, float)) and not isinstance(value, bool) else \
+            type(value).__name__
+        shape.add(f"{path}:{json_type}")
+    return shape
+
+
+def get_mode():
+    return utilities.read_configs("cassettes", "mode") or "off"
+
+
+# Cassette file of a test node id, ex: test_api/test_pet_api/test_place_order.json
+def get_cassette_path(test_id):
+    module_path, _, test_name = test_id.partition("::")
+    module_path = re.sub(r"^tests/|\.py$", "", module_path.replace(os.sep, "/"))
+    file_name = re.sub(r"[^\w.\-\[\]]", "_", test_name.replace("::", "."))
+    return os.path.join(CASSETTES_PATH, *module_path.split("/"), f"{file_name}.json")
+
+
+def read_recorded_seed():
+    try:
+        with open(SEED_FILE_PATH) as seed_file:
+            return json.load(seed_file)["seed"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def write_recorded_seed(seed):
+    os.makedirs(CASSETTES_PATH, exist_ok=True)
+    with open(SEED_FILE_PATH, "w") as seed_file:
+        json.dump({"version": CASSETTE_VERSION, "seed": seed}, seed_file)
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+# Use the cassette of a test until end_test, the mode and matching rules come from [cassettes] in config.ini
+def start_test(test_id, seed):
+    global _cassette
+    cassette = Cassette(get_cassette_path(test_id), get_mode(),
+                        match_on=utilities.read_list_config("cassettes", "match_on"),
+                        redacted_fields=utilities.read_list_config("cassettes", "redact"),
+                        seed=seed)
+    with _cassette_lock:
+        _cassette = cassette
+        return cassette
+
+
+# Stop using the cassette of the test and save it when recording
+def end_test():
+    global _cassette
+    with _cassette_lock:
+        cassette, _cassette = _cassette, None
+    if cassette is not None and cassette.mode == "record" and cassette.interactions:
+        cassette.save()
+    return cassette
+
+
+def get_active_cassette():
+    return _cassette
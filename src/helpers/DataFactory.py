@@ -0,0 +1,121 @@
+import hashlib
+import itertools
+import random
+import threading
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+
+from faker import Faker
+
+from src.utilities import settings, utilities
+
+TEMPLATES_FILE = "test_data/payload_templates.json"
+# Faker methods pre-generated into pools, templates pick values from them with "$pool"
+POOL_FIELDS = ("first_name", "image_url")
+# Frozen clocks of replayable runs pick a time within a year of this date from the test seed
+FROZEN_CLOCK_EPOCH = datetime(2024, 1, 1)
+
+
+# Faker values generated in bulk once per session, the same seed builds the same pools on every worker
+class DataPools:
+    def __init__(self, seed, size):
+        fake = Faker()
+        fake.seed_instance(seed)
+        self.seed = seed
+        self.values = {field: tuple(getattr(fake, field)() for _ in range(size)) for field in POOL_FIELDS}
+
+
+# Payload builder of one test, seeded from the session seed and the test node id so a test can be replayed alone.
+# A frozen clock makes "$now" fields derive from the seed as well, ex: while API exchanges are recorded or replayed
+class DataFactory:
+    def __init__(self, pools, test_id, frozen_clock=False):
+        self.pools = pools
+        self.test_id = test_id
+        self.test_seed = get_test_seed(pools.seed, test_id)
+        self.random = random.Random(self.test_seed)
+        self.frozen_now = FROZEN_CLOCK_EPOCH + timedelta(seconds=self.test_seed % (365 * 24 * 3600)) \
+            if frozen_clock else None
+        # Unique values carry a key of the test node id, node ids are unique so workers never collide
+        self.test_key = hashlib.sha256(test_id.encode()).hexdigest()[:8]
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+
+    # Render a template from payload_templates.json, params fill its "$param" fields
+    def build(self, data_type, **params):
+        templates = settings.read_data_file(TEMPLATES_FILE)
+        if data_type not in templates:
+            return ""
+        with self.lock:
+            return self.render(templates[data_type], params)
+
+    def render(self, template, params):
+        if isinstance(template, Mapping):
+            if len(template) == 1 and next(iter(template)).startswith("$"):
+                directive, argument = next(iter(template.items()))
+                return self.render_directive(directive, argument, params)
+            return {key: self.render(value, params) for key, value in template.items()}
+        if isinstance(template, (list, tuple)):
+            return [self.render(value, params) for value in template]
+        return template
+
+    def render_directive(self, directive, argument, params):
+        if directive == "$pool":
+            pool = self.pools.values[argument]
+            return pool[self.random.randrange(len(pool))]
+        if directive == "$choice":
+            return self.random.choice(argument)
+        if directive == "$int":
+            return self.random.randint(*argument)
+        if directive == "$param":
+            return params[argument]
+        if directive == "$now":
+            return getattr(self.frozen_now or datetime.now(), argument)()
+        if directive == "$unique":
+            return f"{self.render(argument, params)}-{self.test_key}{next(self.counter)}"
+        raise ValueError(f"Unknown template directive: {directive}")
+
+
+def get_test_seed(seed, test_id):
+    return int(hashlib.sha256(f"{seed}:{test_id}".encode()).hexdigest()[:16], 16)
+
+
+# Session seed from [test_data] seed, a random one when it's not set
+def read_session_seed():
+    seed = utilities.read_configs("test_data", "seed")
+    return int(seed) if seed else random.SystemRandom().randrange(2 ** 32)
+
+
+_pools = None
+_factory = None
+_factory_lock = threading.RLock()
+
+
+# Build the pools of this process, done once per session before the first test
+def start_session(seed, pool_size=None):
+    global _pools, _factory
+    with _factory_lock:
+        if _pools is None or _pools.seed != seed:
+            _pools = DataPools(seed, pool_size or utilities.read_int_config("test_data", "pool_size"))
+        _factory = None
+        return _pools
+
+
+# Switch to the factory of a new test, APIHelper instances created afterwards use it
+def start_test(test_id, frozen_clock=False):
+    global _factory
+    pools = _pools if _pools is not None else start_session(read_session_seed())
+    with _factory_lock:
+        _factory = DataFactory(pools, test_id, frozen_clock)
+        return _factory
+
+
+# Factory of the running test, outside pytest (ex: load tests) one shared factory is created on first use
+def get_data_factory():
+    with _factory_lock:
+        if _factory is None:
+            return start_test("default")
+        return _factory
+
+
+def get_session_seed():
+    return _pools.seed if _pools is not None else None
@@ -0,0 +1,226 @@
+import itertools
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+VALID_PASSWORD = "pwd"
+# White 1x1 PNG, screenshots are decoded and compressed like real ones
+SCREENSHOT_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4//8/AAX+Av4N70a4AAAAAElFTkSuQmCC"
+
+
+# Element of a fake page, found by any of its (selector, value) locators
+class FakeElement:
+    def __init__(self, element_id, locators, text="", value="", on_click=None, **attributes):
+        self.element_id = element_id
+        self.locators = set(locators)
+        self.text = text
+        self.value = value
+        self.on_click = on_click
+        self.attributes = attributes
+
+
+# Browser tab of the fake browser, navigating builds the elements of the page again so old handles become stale
+class FakeWindow:
+    def __init__(self, handle):
+        self.handle = handle
+        self.url = "about:blank"
+        self.title = ""
+        self.elements = []
+
+
+# In-memory command executor answering WebDriver commands for the pages used by the page objects of
+# WebPagesHelper, ex: the Sample App login. Lets the real selenium client run without a browser or a driver binary
+class FakeCommandExecutor:
+    def __init__(self, web_base_url):
+        self.web_base_url = web_base_url.rstrip("/")
+        self.ids = itertools.count(1)
+        self.windows = {}
+        self.current_window = self.new_window()
+        self.commands = 0
+        self.handlers = {
+            Command.NEW_SESSION: lambda params: {"sessionId": "fake-session", "capabilities": {"browserName": "fake"}},
+            Command.GET: lambda params: self.navigate(params["url"]),
+            Command.GET_CURRENT_URL: lambda params: self.current_window.url,
+            Command.GET_TITLE: lambda params: self.current_window.title,
+            Command.GET_PAGE_SOURCE: lambda params: self.get_page_source(),
+            Command.FIND_ELEMENT: lambda params: self.find_element(params["using"], params["value"]),
+            Command.FIND_ELEMENTS: lambda params: self.find_elements(params["using"], params["value"]),
+            Command.CLICK_ELEMENT: lambda params: self.click(self.get_element(params["id"])),
+            Command.CLEAR_ELEMENT: lambda params: setattr(self.get_element(params["id"]), "value", ""),
+            Command.SEND_KEYS_TO_ELEMENT: lambda params: self.send_keys(self.get_element(params["id"]), params["text"]),
+            Command.GET_ELEMENT_TEXT: lambda params: self.get_element(params["id"]).text,
+            Command.GET_ELEMENT_PROPERTY: lambda params: self.get_attribute(self.get_element(params["id"]),
+                                                                           params["name"]),
+            Command.GET_ELEMENT_ATTRIBUTE: lambda params: self.get_attribute(self.get_element(params["id"]),
+                                                                            params["name"]),
+            Command.IS_ELEMENT_ENABLED: lambda params: bool(self.get_element(params["id"])),
+            Command.W3C_EXECUTE_SCRIPT: lambda params: self.execute_script(params["script"], params["args"]),
+            Command.W3C_GET_CURRENT_WINDOW_HANDLE: lambda params: self.current_window.handle,
+            Command.W3C_GET_WINDOW_HANDLES: lambda params: list(self.windows),
+            Command.NEW_WINDOW: lambda params: {"handle": self.new_window().handle, "type": params.get("type")},
+            Command.SWITCH_TO_WINDOW: lambda params: self.switch_to_window(params["handle"]),
+            Command.CLOSE: lambda params: self.close_window(),
+            Command.DELETE_ALL_COOKIES: lambda params: None,
+            Command.W3C_ACTIONS: lambda params: None,
+            Command.W3C_CLEAR_ACTIONS: lambda params: None,
+            Command.SCREENSHOT: lambda params: SCREENSHOT_BASE64,
+            Command.QUIT: lambda params: None,
+        }
+
+    # Same contract as RemoteConnection.execute, errors are returned as W3C error responses
+    def execute(self, command, params):
+        self.commands += 1
+        handler = self.handlers.get(command)
+        if handler is None:
+            return self.error("unknown command", f"Fake browser does not support {command}")
+        try:
+            return {"value": handler(params)}
+        except LookupError as exception:
+            return exception.args[0]
+
+    # Called by the driver on quit, like RemoteConnection.close
+    def close(self):
+        self.windows.clear()
+
+    @staticmethod
+    def error(error, message):
+        return {"status": error, "value": {"error": error, "message": message}}
+
+    def new_window(self):
+        window = FakeWindow(f"window-{next(self.ids)}")
+        self.windows[window.handle] = window
+        return window
+
+    def switch_to_window(self, handle):
+        if handle not in self.windows:
+            raise LookupError(self.error("no such window", f"No window with handle {handle}"))
+        self.current_window = self.windows[handle]
+
+    # Closing the current window leaves no current window until the client switches to another one
+    def close_window(self):
+        self.windows.pop(self.current_window.handle, None)
+        return list(self.windows)
+
+    def navigate(self, url):
+        window = self.current_window
+        window.url = url
+        path = urlsplit(url).path.rstrip("/") or "/"
+        build_page = {"/": self.build_home_page,
+                      "/click": self.build_click_page,
+                      "/dynamictable": self.build_dynamic_table_page,
+                      "/sampleapp": self.build_sample_app_page}.get(path)
+        window.title, window.elements = build_page() if build_page is not None else ("Not Found", [])
+
+    # Elements
+    def new_element(self, locators, text="", on_click=None, **attributes):
+        attributes.setdefault("id", next((value for selector, value in locators if selector == "id"), None))
+        return FakeElement(f"element-{next(self.ids)}", locators, text, on_click=on_click, **attributes)
+
+    def find_element(self, selector, value):
+        for element in self.current_window.elements:
+            if (selector, value) in element.locators:
+                return {ELEMENT_KEY: element.element_id}
+        raise LookupError(self.error("no such element", f"Unable to locate element: {selector}={value}"))
+
+    def find_elements(self, selector, value):
+        return [{ELEMENT_KEY: element.element_id} for element in self.current_window.elements
+                if (selector, value) in element.locators]
+
+    # Elements of pages navigated away from are stale
+    def get_element(self, element_id):
+        for element in self.current_window.elements:
+            if element.element_id == element_id:
+                return element
+        raise LookupError(self.error("stale element reference", f"Element {element_id} is not attached"))
+
+    def click(self, element):
+        if element.on_click is not None:
+            element.on_click(element)
+
+    @staticmethod
+    def send_keys(element, text):
+        element.value += text
+
+    @staticmethod
+    def get_attribute(element, name):
+        return element.value if name == "value" else element.attributes.get(name)
+
+    # Scripts run by selenium and the page objects, recognized by what they contain. Element arguments of pages
+    # navigated away from are stale like in a browser
+    def execute_script(self, script, args):
+        elements = [self.get_element(arg[ELEMENT_KEY]) for arg in args if isinstance(arg, dict) and ELEMENT_KEY in arg]
+        if "document.readyState" in script:
+            return "complete"
+        if "window.location.href = arguments[0]" in script:
+            return self.navigate(args[0])
+        if "arguments[0].map(findElement)" in script:
+            return [next(iter(self.find_elements(selector, value)), None) for selector, value in args[0]]
+        if script.startswith("/* getAttribute */"):
+            return self.get_attribute(elements[0], args[1])
+        if script.startswith("/* isDisplayed */"):
+            return True
+        if "columnheader" in script:
+            return elements[0].attributes["table"]
+        return None
+
+    def get_page_source(self):
+        return f"<html><head><title>{self.current_window.title}</title></head><body></body></html>"
+
+    # Pages
+    def build_home_page(self):
+        links = {"Class Attribute": "/classattr", "Click": "/click", "Dynamic Table": "/dynamictable",
+                 "Sample App": "/sampleapp"}
+        return "UI Test Automation Playground", [
+            self.new_element({("link text", text), ("partial link text", text)}, text,
+                             on_click=lambda element, path=path: self.navigate(self.web_base_url + path),
+                             href=self.web_base_url + path)
+            for text, path in links.items()]
+
+    # The button turns green when clicked
+    def build_click_page(self):
+        return "Click", [self.new_element(get_id_locators("badButton"), "Button That Ignores DOM Click Event",
+                                          on_click=lambda element: element.attributes.update(
+                                              {"class": "btn btn-success"}),
+                                          **{"class": "btn btn-primary"})]
+
+    def build_dynamic_table_page(self):
+        table = {"headers": ["Name", "CPU", "Memory"],
+                 "rows": [["Chrome", "3.1%", "22.5 MB"], ["Firefox", "1.2%", "40.1 MB"]]}
+        return "Dynamic Table", [
+            self.new_element({("css selector", ".bg-warning"), ("class name", "bg-warning")}, "Chrome CPU: 3.1%"),
+            self.new_element({("css selector", "[role='table'][aria-label='Tasks']")}, table=table)]
+
+    # Login succeeds with any user name and the password VALID_PASSWORD, like the real Sample App
+    def build_sample_app_page(self):
+        login_status = self.new_element(get_id_locators("loginstatus"), "User logged out.")
+        user_name = self.new_element({("css selector", "input[name='UserName']")})
+        password = self.new_element({("css selector", "input[name='Password']")})
+
+        def login_or_logout(login_button):
+            if login_button.text == "Log Out":
+                login_status.text, login_button.text = "User logged out.", "Log In"
+            elif user_name.value and password.value == VALID_PASSWORD:
+                login_status.text, login_button.text = f"Welcome, {user_name.value}!", "Log Out"
+            else:
+                login_status.text = "Invalid username/password"
+
+        login_button = self.new_element(get_id_locators("login"), "Log In", on_click=login_or_logout)
+        return "Sample App", [login_status, user_name, password, login_button]
+
+    def stats(self):
+        return {"commands": self.commands, "windows": len(self.windows)}
+
+
+# Selenium sends By.ID locators as css selectors, page objects finding elements by script send them as they are
+def get_id_locators(element_id):
+    return {("id", element_id), ("css selector", f'[id="{element_id}"]')}
+
+
+# Real selenium Remote driver sending its commands to a fake in-memory browser opened on web_base_url
+def create_fake_driver(web_base_url):
+    command_executor = FakeCommandExecutor(web_base_url)
+    driver = webdriver.Remote(command_executor=command_executor, options=webdriver.ChromeOptions())
+    driver.get(web_base_url)
+    return driver
@@ -0,0 +1,197 @@
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from src.helpers import Cassette
+from src.utilities import api_metrics, utilities
+
+# Time spent opening connections (DNS, TCP and TLS) by the request running on this thread
+_connect_timing = threading.local()
+
+
+# Shared HTTP transport used by API helpers, one connection pool per worker process
+class HTTPTransport:
+    def __init__(self):
+        # Pool and connection settings
+        self.pool_connections = utilities.read_int_config("transport", "pool_connections")
+        self.pool_maxsize = utilities.read_int_config("transport", "pool_maxsize")
+        self.pool_block = utilities.read_bool_config("transport", "pool_block")
+        self.keep_alive = utilities.read_bool_config("transport", "keep_alive")
+        self.timeout = (utilities.read_float_config("transport", "connect_timeout"),
+                        utilities.read_float_config("transport", "read_timeout"))
+
+        # Retry and backoff policy
+        self.retries = Retry(
+            total=utilities.read_int_config("transport", "retries"),
+            backoff_factor=utilities.read_float_config("transport", "backoff_factor"),
+            status_forcelist=utilities.read_list_config("transport", "retry_statuses", int),
+            allowed_methods=utilities.read_list_config("transport", "retry_methods", str.upper),
+            # Return the last response instead of raising so status code assertions still apply
+            raise_on_status=False
+        )
+
+        # Connection reuse stats
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.requests_sent = 0
+        self.connections_opened = 0
+        # Callables notified after every request, ex: load test latency recorder
+        self.listeners = []
+        self.metrics_enabled = utilities.read_bool_config("metrics", "enabled")
+
+        self.session = requests.Session()
+        if not self.keep_alive:
+            self.session.headers["Connection"] = "close"
+        # Requests go through the cassette of the running test when recording, replaying or verifying exchanges
+        adapter_class = Cassette.CassetteAdapter if Cassette.get_mode() != "off" else HTTPAdapter
+        adapter = adapter_class(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize,
+                                max_retries=self.retries, pool_block=self.pool_block)
+        adapter.poolmanager.pool_classes_by_scheme = self._counting_pool_classes()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # Request Methods
+    # Operation is the name of the API helper method sending the request, passed to listeners and metrics
+    def request(self, method, url, operation=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        operation = operation or f"{method} {url}"
+        with self.lock:
+            self.requests_sent += 1
+
+        # Streamed bodies are left unread for the caller to consume, ex: iter_json_array
+        stream = kwargs.pop("stream", False)
+        _connect_timing.elapsed = 0.0
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            # Body is downloaded separately so time to first byte and download time can be told apart
+            response = self.session.request(method, url, stream=True, **kwargs)
+            headers_received = time.perf_counter()
+            if not stream:
+                response.content
+            if self.metrics_enabled:
+                self._record_call(operation, method, url, response, start, headers_received, stream)
+            return response
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            if self.listeners:
+                elapsed = time.perf_counter() - start
+                for listener in list(self.listeners):
+                    listener(operation=operation, method=method, url=url,
+                             response=response, error=error, elapsed=elapsed)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    # Stats Methods
+    def stats(self):
+        with self.lock:
+            requests_sent, connections_opened = self.requests_sent, self.connections_opened
+        connections_reused = max(requests_sent - connections_opened, 0)
+        reuse_ratio = connections_reused / requests_sent if requests_sent else 0.0
+        return {"requests_sent": requests_sent,
+                "connections_opened": connections_opened,
+                "connections_reused": connections_reused,
+                "reuse_ratio": round(reuse_ratio, 3)}
+
+    @staticmethod
+    def _record_call(operation, method, url, response, start, headers_received, streamed=False):
+        end = time.perf_counter()
+        connect_elapsed = getattr(_connect_timing, "elapsed", 0.0)
+        record = api_metrics.new_call_record(operation, method, url)
+        record["status_code"] = response.status_code
+        record["dns_connect_ms"] = round(connect_elapsed * 1000, 3)
+        record["ttfb_ms"] = round(max(headers_received - start - connect_elapsed, 0.0) * 1000, 3)
+        record["download_ms"] = round((end - headers_received) * 1000, 3)
+        record["total_ms"] = round((end - start) * 1000, 3)
+        record["request_bytes"] = api_metrics.get_request_size(response.request)
+        record["response_bytes"] = api_metrics.get_response_size(response, streamed)
+        api_metrics.add_call_record(record)
+
+    def _count_new_connection(self):
+        with self.lock:
+            self.connections_opened += 1
+
+    def _counting_pool_classes(self):
+        # urllib3 pools calling back into the transport whenever a new connection is opened
+        transport = self
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = TimedHTTPConnection
+
+            def _new_conn(self):
+                transport._count_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = TimedHTTPSConnection
+
+            def _new_conn(self):
+                transport._count_new_connection()
+                return super()._new_conn()
+
+        return {"http": CountingHTTPConnectionPool, "https": CountingHTTPSConnectionPool}
+
+
+# urllib3 connections adding their connect time, including DNS and TLS handshake, to the thread timing
+class TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.elapsed = getattr(_connect_timing, "elapsed", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_timing.elapsed = getattr(_connect_timing, "elapsed", 0.0) + time.perf_counter() - start
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+# Return the transport of the current worker, creating it on first use or after a fork
+def get_transport():
+    global _transport
+    with _transport_lock:
+        if _transport is None or _transport.pid != os.getpid():
+            _transport = HTTPTransport()
+        return _transport
+
+
+# Return the transport of the current worker only if it was already created
+def get_existing_transport():
+    if _transport is not None and _transport.pid == os.getpid():
+        return _transport
+    return None
+
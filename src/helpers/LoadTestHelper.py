@@ -0,0 +1,265 @@
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.helpers import ResourceRegistry
+from src.helpers.APIHelper import APIHelper
+from src.helpers.HTTPTransport import get_transport
+from src.helpers.PetstoreStub import PetstoreStubServer
+from src.utilities import settings, utilities
+
+# Histogram bucket upper bounds in milliseconds
+HISTOGRAM_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+# Functional API test flows reused as load scenarios, imported lazily so pytest is not needed to list them
+def load_scenarios():
+    from tests.test_api import test_pet_api
+    return {"place_order": test_pet_api.test_place_order,
+            "update_existing_pet": test_pet_api.test_update_existing_pet,
+            "delete_existing_pet": test_pet_api.test_delete_existing_pet}
+
+
+# Latency samples and outcomes per name, names are APIHelper methods or scenarios
+class LatencyRecorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def record(self, name, elapsed, failed):
+        with self.lock:
+            self.samples.setdefault(name, []).append(elapsed)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    # Transport listener, a request fails when it raised or the server answered with 5xx
+    def record_request(self, operation, response, error, elapsed, **kwargs):
+        self.record(operation, elapsed, error is not None or response.status_code >= 500)
+
+    def summary(self, duration):
+        with self.lock:
+            samples = {name: sorted(values) for name, values in self.samples.items()}
+            errors = dict(self.errors)
+        return {name: summarize_samples(values, errors.get(name, 0), duration) for name, values in samples.items()}
+
+
+# Runs weighted scenarios at a target rate (open model) or a fixed concurrency (closed model) with ramp-up
+class LoadRunner:
+    def __init__(self, scenarios, weights, duration, concurrency=10, rps=None, ramp_up=0.0, seed=None):
+        self.scenarios = scenarios
+        self.scenario_names = list(weights)
+        self.scenario_weights = [weights[name] for name in self.scenario_names]
+        self.duration = duration
+        self.concurrency = concurrency
+        self.rps = rps
+        self.ramp_up = ramp_up
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.request_recorder = LatencyRecorder()
+        self.scenario_recorder = LatencyRecorder()
+        self.missed_arrivals = 0
+        self.failures = {}
+
+    def run(self):
+        transport = get_transport()
+        transport.add_listener(self.request_recorder.record_request)
+        # Latency recorder replaces per-call metrics records, nothing would collect them during a load test
+        metrics_enabled, transport.metrics_enabled = transport.metrics_enabled, False
+        start = time.perf_counter()
+        try:
+            if self.rps:
+                self._run_open_model(start)
+            else:
+                self._run_closed_model(start)
+        finally:
+            transport.remove_listener(self.request_recorder.record_request)
+            transport.metrics_enabled = metrics_enabled
+        return self.report(time.perf_counter() - start)
+
+    def report(self, elapsed):
+        scenarios = self.scenario_recorder.summary(elapsed)
+        iterations = sum(scenario["count"] for scenario in scenarios.values())
+        failed_iterations = sum(scenario["errors"] for scenario in scenarios.values())
+        return {"duration": round(elapsed, 3),
+                "mode": "rps" if self.rps else "concurrency",
+                "target_rps": self.rps,
+                "concurrency": self.concurrency,
+                "iterations": iterations,
+                "throughput": round(iterations / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(failed_iterations / iterations, 4) if iterations else 0.0,
+                "missed_arrivals": self.missed_arrivals,
+                "failures": dict(self.failures),
+                "scenarios": scenarios,
+                "operations": self.request_recorder.summary(elapsed)}
+
+    # Fraction of the target load applied at elapsed seconds
+    def ramp_factor(self, elapsed):
+        if self.ramp_up <= 0:
+            return 1.0
+        return min(1.0, max(elapsed / self.ramp_up, 0.01))
+
+    def run_iteration(self):
+        with self.random_lock:
+            name = self.random.choices(self.scenario_names, self.scenario_weights)[0]
+        start = time.perf_counter()
+        failed = True
+        try:
+            self.scenarios[name]()
+            failed = False
+        except Exception as exception:
+            failure = f"{name}: {type(exception).__name__}"
+            with self.random_lock:
+                self.failures[failure] = self.failures.get(failure, 0) + 1
+        finally:
+            self.scenario_recorder.record(name, time.perf_counter() - start, failed)
+
+    def _run_closed_model(self, start):
+        def run_user(user_index):
+            while True:
+                elapsed = time.perf_counter() - start
+                if elapsed >= self.duration:
+                    return
+                # Users join one by one during ramp-up
+                if user_index >= max(1, round(self.concurrency * self.ramp_factor(elapsed))):
+                    time.sleep(0.05)
+                    continue
+                self.run_iteration()
+
+        users = [threading.Thread(target=run_user, args=(index,), name=f"load-user-{index}")
+                 for index in range(self.concurrency)]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join()
+
+    def _run_open_model(self, start):
+        free_slots = threading.BoundedSemaphore(self.concurrency)
+
+        def run_arrival():
+            try:
+                self.run_iteration()
+            finally:
+                free_slots.release()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="load-user") as executor:
+            next_arrival = start
+            while next_arrival - start < self.duration:
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+                # Arrivals finding every slot busy are counted instead of queued so saturation is visible
+                if free_slots.acquire(blocking=False):
+                    executor.submit(run_arrival)
+                else:
+                    self.missed_arrivals += 1
+                next_arrival += 1 / (self.rps * self.ramp_factor(next_arrival - start))
+
+
+def summarize_samples(sorted_samples, errors, duration):
+    count = len(sorted_samples)
+    histogram = {f"<={bucket}ms": 0 for bucket in HISTOGRAM_BUCKETS_MS}
+    histogram[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+    for sample in sorted_samples:
+        sample_ms = sample * 1000
+        bucket = next((bucket for bucket in HISTOGRAM_BUCKETS_MS if sample_ms <= bucket), None)
+        histogram[f"<={bucket}ms" if bucket is not None else f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+    return {"count": count,
+            "errors": errors,
+            "error_rate": round(errors / count, 4) if count else 0.0,
+            "throughput": round(count / duration, 2) if duration else 0.0,
+            "p50_ms": percentile_ms(sorted_samples, 50),
+            "p95_ms": percentile_ms(sorted_samples, 95),
+            "p99_ms": percentile_ms(sorted_samples, 99),
+            "max_ms": round(sorted_samples[-1] * 1000, 2) if count else 0.0,
+            "histogram": histogram}
+
+
+# Nearest-rank percentile of sorted samples in milliseconds
+def percentile_ms(sorted_samples, percent):
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, -(-len(sorted_samples) * percent // 100) - 1))
+    return round(sorted_samples[int(rank)] * 1000, 2)
+
+
+def format_report(report):
+    lines = [f"Duration: {report['duration']}s, mode: {report['mode']}, iterations: {report['iterations']}, "
+             f"throughput: {report['throughput']}/s, error rate: {report['error_rate']:.2%}, "
+             f"missed arrivals: {report['missed_arrivals']}"]
+    for title, rows in (("Scenario", report["scenarios"]), ("APIHelper method", report["operations"])):
+        lines.append("")
+        lines.append(f"{title:<24}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, row in sorted(rows.items()):
+            lines.append(f"{name:<24}{row['count']:>8}{row['errors']:>8}{row['throughput']:>9}"
+                         f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    if report["failures"]:
+        lines.append("")
+        lines.append("Failures:")
+        for failure, count in sorted(report["failures"].items(), key=lambda item: -item[1]):
+            lines.append(f"  {count} x {failure}")
+    return "\n".join(lines)
+
+
+# Parse "name=weight,name=weight" into a dict of weights
+def parse_mix(mix, scenario_names):
+    if not mix:
+        return {name: 1.0 for name in scenario_names}
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in scenario_names:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}', choose from: {', '.join(scenario_names)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run API test flows as a weighted load test.")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent virtual users or max in-flight.")
+    parser.add_argument("--rps", type=float, default=None,
+                        help="Target scenario iterations per second, runs at fixed concurrency when not set.")
+    parser.add_argument("--ramp-up", type=float, default=0, help="Seconds to ramp up to the target load.")
+    parser.add_argument("--mix", default="", help="Weighted scenario mix. ex: place_order=3,delete_existing_pet=1")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the scenario picker.")
+    parser.add_argument("--petstore", choices=("remote", "local"), default="remote",
+                        help="Target api_base_url or an in-process Petstore stub.")
+    parser.add_argument("--json", dest="json_path", default=None, help="Write the report as json to this path.")
+    args = parser.parse_args(argv)
+
+    scenarios = load_scenarios()
+    weights = parse_mix(args.mix, list(scenarios))
+    stub_server = None
+    if args.petstore == "local":
+        stub_server = PetstoreStubServer(initial_pets=200).start()
+        settings.settings_store.override("api", "api_base_url", stub_server.base_url)
+    try:
+        runner = LoadRunner(scenarios, weights, args.duration, concurrency=args.concurrency, rps=args.rps,
+                            ramp_up=args.ramp_up, seed=args.seed)
+        report = runner.run()
+        # Pets and orders created by the scenarios are deleted once the load is over
+        cleanup = ResourceRegistry.get_session_registry().cleanup(
+            APIHelper().delete_resource, utilities.read_int_config("resources", "batch_size"))
+        report["cleanup"] = {"deleted": cleanup["deleted"], "already_gone": cleanup["already_gone"],
+                             "leaked": len(cleanup["leaked"])}
+    finally:
+        if stub_server is not None:
+            stub_server.stop()
+        utilities.stop_logger()
+        utilities.merge_worker_log_files()
+
+    print(format_report(report))
+    print(f"\nCleanup: deleted {report['cleanup']['deleted']}, already gone {report['cleanup']['already_gone']}, "
+          f"leaked {report['cleanup']['leaked']}")
+    if args.json_path:
+        with open(args.json_path, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+    return 1 if report["error_rate"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
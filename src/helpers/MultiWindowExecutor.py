@@ -0,0 +1,106 @@
+import threading
+import time
+
+from selenium.common import WebDriverException
+
+from src.helpers import WaitHelper
+from src.helpers.WebDriverHelper import capture_failure_artifacts
+from src.utilities import artifacts, utilities
+
+
+# Runs the rows of a data-driven web test in tabs of one browser. Every tab of a batch starts loading its page
+# before the first row runs so page loads overlap, then each row runs in its own tab.
+# Tabs share cookies and storage of the browser, rows must not depend on them
+class MultiWindowExecutor:
+    def __init__(self, web_base_url, max_windows=8, page_load_timeout=10):
+        self.web_base_url = web_base_url.rstrip("/")
+        self.max_windows = max_windows
+        self.page_load_timeout = page_load_timeout
+        self.lock = threading.Lock()
+        # Results of each test function, keyed by row id
+        self.results = {}
+
+        # Metrics
+        self.matrices = 0
+        self.rows = 0
+        self.failed_rows = 0
+        self.windows = 0
+        self.seconds = 0
+
+    # Result of one row, the first row requested runs every row of its test
+    def get_result(self, test_key, driver, row_function, rows, row_id, start_path="/"):
+        with self.lock:
+            if test_key not in self.results:
+                self.results[test_key] = self.run(driver, row_function, rows, start_path)
+            return self.results[test_key][row_id]
+
+    # Run rows, a dict of row id to row function arguments, max_windows tabs at a time
+    def run(self, driver, row_function, rows, start_path="/"):
+        url = self.web_base_url + start_path
+        original_window = driver.current_window_handle
+        row_ids = list(rows)
+        results = {}
+        started = time.perf_counter()
+        for batch_start in range(0, len(row_ids), self.max_windows):
+            batch = row_ids[batch_start:batch_start + self.max_windows]
+            windows = self.open_windows(driver, url, len(batch))
+            try:
+                for window_number, (row_id, window) in enumerate(zip(batch, windows), start=batch_start + 1):
+                    results[row_id] = self.run_row(driver, window, window_number, row_function, rows[row_id], url)
+            finally:
+                self.close_windows(driver, windows, original_window)
+        elapsed = time.perf_counter() - started
+        failed_rows = sum(result["error"] is not None for result in results.values())
+        self.matrices += 1
+        self.rows += len(results)
+        self.failed_rows += failed_rows
+        self.windows += len(row_ids)
+        self.seconds += elapsed
+        utilities.custom_logger().info(f"Ran {len(results)} rows of {row_function.__name__} in browser tabs in "
+                                       f"{elapsed:.2f}s, {failed_rows} failed")
+        return results
+
+    # Open one tab per row and start loading the url in each without waiting for it
+    def open_windows(self, driver, url, count):
+        windows = []
+        for _ in range(count):
+            driver.switch_to.new_window("tab")
+            windows.append(driver.current_window_handle)
+            driver.execute_script("window.location.href = arguments[0];", url)
+        return windows
+
+    # Failures of a row are kept with its artifacts, captured in its own tab, so the other rows still run
+    def run_row(self, driver, window, window_number, row_function, row, url):
+        driver.switch_to.window(window)
+        started = time.perf_counter()
+        error = None
+        row_artifacts = []
+        try:
+            WaitHelper.WaitEngine(driver, self.page_load_timeout).until(WaitHelper.page_loaded(url))
+            row_function(driver, **row)
+        except Exception as exception:
+            error = exception
+            row_artifacts = capture_failure_artifacts(driver, artifacts.get_artifact_writer())
+        return {"window": window_number,
+                "elapsed": round(time.perf_counter() - started, 3),
+                "error": error,
+                "artifacts": row_artifacts}
+
+    @staticmethod
+    def close_windows(driver, windows, original_window):
+        try:
+            for window in windows:
+                driver.switch_to.window(window)
+                driver.close()
+            driver.switch_to.window(original_window)
+        except WebDriverException:
+            # Browser is gone, the pool recycles it when the test releases it
+            pass
+
+    def stats(self):
+        with self.lock:
+            return {"matrices": self.matrices,
+                    "rows": self.rows,
+                    "failed_rows": self.failed_rows,
+                    "windows": self.windows,
+                    "seconds": round(self.seconds, 2)}
@@ -0,0 +1,264 @@
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+PET_STATUSES = ["available", "pending", "sold"]
+ORDER_STATUSES = ["placed", "approved", "delivered"]
+
+
+# In-memory state of the emulated Petstore
+class PetstoreState:
+    def __init__(self, initial_pets=20, seed=0):
+        self.lock = threading.Lock()
+        self.pets = {}
+        self.orders = {}
+        self.next_pet_id = 1
+        self.next_order_id = 1
+        seeded_random = random.Random(seed)
+        for index in range(initial_pets):
+            self.add_pet({"category": {"id": 1, "name": "dogs"},
+                          "name": f"pet-{index}",
+                          "photoUrls": [f"https://example.com/pets/{index}.png"],
+                          "tags": [{"id": 1, "name": "stub"}],
+                          # Every status has pets so inventory always reports the three of them
+                          "status": PET_STATUSES[index % 3] if index < 3 else seeded_random.choice(PET_STATUSES)})
+
+    def add_pet(self, pet):
+        with self.lock:
+            pet = dict(pet)
+            if not pet.get("id"):
+                pet["id"] = self.next_pet_id
+                self.next_pet_id += 1
+            pet.setdefault("photoUrls", [])
+            pet.setdefault("tags", [])
+            self.pets[pet["id"]] = pet
+            return dict(pet)
+
+    # Copies are returned so responses are serialized outside the lock safely
+    def get_pet(self, pet_id):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            return dict(pet) if pet is not None else None
+
+    def find_pets_by_status(self, statuses):
+        with self.lock:
+            return [dict(pet) for pet in self.pets.values() if pet.get("status") in statuses]
+
+    def update_pet(self, pet_id, fields):
+        with self.lock:
+            pet = self.pets.get(pet_id)
+            if pet is not None:
+                pet.update(fields)
+                return dict(pet)
+            return None
+
+    def delete_pet(self, pet_id):
+        with self.lock:
+            return self.pets.pop(pet_id, None)
+
+    def add_order(self, order):
+        with self.lock:
+            order = dict(order)
+            if not order.get("id"):
+                order["id"] = self.next_order_id
+                self.next_order_id += 1
+            order.setdefault("complete", False)
+            self.orders[order["id"]] = order
+            return dict(order)
+
+    def get_order(self, order_id):
+        with self.lock:
+            order = self.orders.get(order_id)
+            return dict(order) if order is not None else None
+
+    def delete_order(self, order_id):
+        with self.lock:
+            return self.orders.pop(order_id, None)
+
+    def get_inventory(self):
+        with self.lock:
+            inventory = {status: 0 for status in PET_STATUSES}
+            for pet in self.pets.values():
+                if pet.get("status") is not None:
+                    inventory[pet["status"]] = inventory.get(pet["status"], 0) + 1
+            return inventory
+
+
+# Multi-threaded local HTTP server emulating the Petstore endpoints used by APIHelper
+class PetstoreStubServer:
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0.0, latency_jitter_ms=0.0,
+                 error_rate=0.0, error_status=500, seed=0, initial_pets=20):
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.state = PetstoreState(initial_pets, seed)
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.requests_served = 0
+        self.errors_injected = 0
+        self.http_server = _StubHTTPServer((host, port), _build_handler(self))
+        self.http_server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.http_server.server_address[:2]
+        return f"http://{host}:{port}/v2"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.http_server.serve_forever, name="petstore-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def stats(self):
+        return {"requests_served": self.requests_served, "errors_injected": self.errors_injected}
+
+    # Seeded latency and error decisions so runs with the same seed behave the same
+    def next_fault(self):
+        with self.random_lock:
+            self.requests_served += 1
+            latency = self.latency_ms + self.random.uniform(0, self.latency_jitter_ms)
+            inject_error = self.random.random() < self.error_rate
+            if inject_error:
+                self.errors_injected += 1
+        return latency / 1000, inject_error
+
+    # Routes return (status code, json body)
+    def route(self, method, path, query, body, content_type):
+        state = self.state
+        match = re.fullmatch(r"/v2/pet/findByStatus", path)
+        if match and method == "GET":
+            statuses = [status for value in query.get("status", []) for status in value.split(",")]
+            return 200, state.find_pets_by_status(statuses)
+
+        match = re.fullmatch(r"/v2/pet", path)
+        if match and method in ("POST", "PUT"):
+            pet = _read_json(body)
+            if not isinstance(pet, dict):
+                return 405, _message(405, "unknown", "Invalid input")
+            if method == "PUT" and state.get_pet(pet.get("id")) is None:
+                return 404, _message(1, "error", "Pet not found")
+            return 200, state.add_pet(pet)
+
+        match = re.fullmatch(r"/v2/pet/([^/]+)", path)
+        if match:
+            pet_id = _read_id(match.group(1))
+            if pet_id is None:
+                return 404, _message(404, "unknown", f"java.lang.NumberFormatException: For input string: "
+                                                      f"\"{match.group(1)}\"")
+            if method == "GET":
+                pet = state.get_pet(pet_id)
+                return (200, pet) if pet is not None else (404, _message(1, "error", "Pet not found"))
+            if method == "POST":
+                form = parse_qs(body.decode()) if "form" in content_type else {}
+                fields = {key: values[0] for key, values in form.items() if key in ("name", "status")}
+                if state.update_pet(pet_id, fields) is None:
+                    return 404, _message(404, "unknown", "not found")
+                return 200, _message(200, "unknown", str(pet_id))
+            if method == "DELETE":
+                if state.delete_pet(pet_id) is None:
+                    return 404, _message(1, "error", "Pet not found")
+                return 200, _message(200, "unknown", str(pet_id))
+
+        match = re.fullmatch(r"/v2/store/order", path)
+        if match and method == "POST":
+            order = _read_json(body)
+            if not isinstance(order, dict):
+                return 400, _message(400, "unknown", "Invalid Order")
+            return 200, state.add_order(order)
+
+        match = re.fullmatch(r"/v2/store/order/([^/]+)", path)
+        if match:
+            order_id = _read_id(match.group(1))
+            if method == "GET":
+                order = state.get_order(order_id) if order_id is not None else None
+                return (200, order) if order is not None else (404, _message(1, "error", "Order not found"))
+            if method == "DELETE":
+                if order_id is None or state.delete_order(order_id) is None:
+                    return 404, _message(404, "unknown", "Order Not Found")
+                return 200, _message(200, "unknown", str(order_id))
+
+        if re.fullmatch(r"/v2/store/inventory", path) and method == "GET":
+            return 200, state.get_inventory()
+        return 404, _message(404, "unknown", "not found")
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # Skip the reverse DNS lookup of HTTPServer.server_bind, it can take seconds on offline runners
+    def server_bind(self):
+        socketserver.TCPServer.server_bind(self)
+        host, port = self.server_address[:2]
+        self.server_name = host
+        self.server_port = port
+
+
+def _build_handler(server):
+    class PetstoreStubHandler(BaseHTTPRequestHandler):
+        # Keep-alive connections like the real Petstore
+        protocol_version = "HTTP/1.1"
+        # Headers and body are written separately, without TCP_NODELAY each response waits for a delayed ACK
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.handle_request("GET")
+
+        def do_POST(self):
+            self.handle_request("POST")
+
+        def do_PUT(self):
+            self.handle_request("PUT")
+
+        def do_DELETE(self):
+            self.handle_request("DELETE")
+
+        def handle_request(self, method):
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            latency, inject_error = server.next_fault()
+            if latency:
+                time.sleep(latency)
+            if inject_error:
+                status_code, response_json = server.error_status, _message(server.error_status, "unknown",
+                                                                           "something bad happened")
+            else:
+                status_code, response_json = server.route(method, url.path, parse_qs(url.query), body,
+                                                           self.headers.get("Content-Type", ""))
+            response_body = json.dumps(response_json).encode()
+            self.send_response(status_code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(response_body)))
+            self.end_headers()
+            self.wfile.write(response_body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return PetstoreStubHandler
+
+
+def _message(code, message_type, message):
+    return {"code": code, "type": message_type, "message": message}
+
+
+def _read_json(body):
+    try:
+        return json.loads(body or b"null")
+    except ValueError:
+        return None
+
+
+def _read_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
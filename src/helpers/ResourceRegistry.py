@@ -0,0 +1,95 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Orders are deleted before the pets they were placed for
+CLEANUP_ORDER = ("order", "pet")
+
+
+# Resources created through APIHelper that still have to be deleted, keyed by (kind, id)
+class ResourceRegistry:
+    def __init__(self, owner):
+        self.owner = owner
+        self.lock = threading.Lock()
+        self.resources = {}
+
+    def register(self, kind, resource_id, created_by=None):
+        with self.lock:
+            self.resources[(kind, resource_id)] = {"kind": kind,
+                                                   "id": resource_id,
+                                                   "owner": self.owner,
+                                                   "created_by": created_by,
+                                                   "created_at": time.time()}
+
+    def unregister(self, kind, resource_id):
+        with self.lock:
+            self.resources.pop((kind, resource_id), None)
+
+    # Keep resources another registry could not delete so they are retried later
+    def adopt(self, resources):
+        with self.lock:
+            for resource in resources:
+                self.resources[(resource["kind"], resource["id"])] = resource
+
+    def pending(self):
+        with self.lock:
+            return list(self.resources.values())
+
+    # Delete every registered resource with at most batch_size requests in flight.
+    # delete_resource(kind, id) returns the response status code, 404 means someone else already deleted it
+    def cleanup(self, delete_resource, batch_size=8):
+        with self.lock:
+            resources, self.resources = list(self.resources.values()), {}
+        result = {"deleted": 0, "already_gone": 0, "leaked": []}
+        if not resources:
+            return result
+
+        def delete(resource):
+            try:
+                return delete_resource(resource["kind"], resource["id"]), None
+            except Exception as exception:
+                return None, f"{type(exception).__name__}: {exception}"
+
+        with ThreadPoolExecutor(max_workers=min(batch_size, len(resources)),
+                                thread_name_prefix="resource-cleanup") as executor:
+            for kind in CLEANUP_ORDER:
+                batch = [resource for resource in resources if resource["kind"] == kind]
+                # A failed deletion never stops the others, it is reported as leaked instead
+                for resource, (status_code, error) in zip(batch, executor.map(delete, batch)):
+                    if status_code == 200:
+                        result["deleted"] += 1
+                    elif status_code == 404:
+                        result["already_gone"] += 1
+                    else:
+                        result["leaked"].append({**resource, "status_code": status_code, "error": error})
+        return result
+
+
+_session_registry = ResourceRegistry("session")
+_test_registry = None
+_registry_lock = threading.Lock()
+
+
+# Start a registry for a test, resources created until end_test are deleted with it
+def start_test(test_id):
+    global _test_registry
+    with _registry_lock:
+        _test_registry = ResourceRegistry(test_id)
+        return _test_registry
+
+
+def end_test():
+    global _test_registry
+    with _registry_lock:
+        registry, _test_registry = _test_registry, None
+        return registry
+
+
+# Registry of the running test, the session registry when resources are tracked per session or outside pytest
+def get_resource_registry():
+    with _registry_lock:
+        return _test_registry if _test_registry is not None else _session_registry
+
+
+def get_session_registry():
+    return _session_registry
@@ -0,0 +1,130 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from requests.structures import CaseInsensitiveDict
+
+from src.utilities import utilities
+
+
+# Stored copy of a GET response, every json() call parses a new object so tests can change it freely
+class CachedResponse:
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @classmethod
+    def from_response(cls, response):
+        return cls(response.status_code, CaseInsensitiveDict(response.headers), response.content)
+
+    def json(self):
+        return json.loads(self.content)
+
+
+# LRU cache of GET responses with a time to live, entries carry tags that mutations invalidate
+class ResponseCache:
+    def __init__(self, max_entries=256, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        # Generation of the last invalidation of each tag, responses fetched before it are not stored
+        self.generation = 0
+        self.tag_generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            if _bypass.active:
+                self.bypasses += 1
+                return None
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def start_fetch(self):
+        with self.lock:
+            return self.generation
+
+    # Store unless one of the tags was invalidated while the response was being fetched
+    def put(self, key, response, tags, fetch_generation):
+        with self.lock:
+            if any(self.tag_generations.get(tag, -1) > fetch_generation for tag in tags):
+                return
+            self.entries[key] = (time.monotonic() + self.ttl, response, frozenset(tags))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self.lock:
+            self.generation += 1
+            for tag in tags:
+                self.tag_generations[tag] = self.generation
+            stale_keys = [key for key, entry in self.entries.items() if entry[2] & set(tags)]
+            for key in stale_keys:
+                del self.entries[key]
+            self.invalidations += len(stale_keys)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "bypasses": self.bypasses,
+                    "evictions": self.evictions,
+                    "invalidations": self.invalidations,
+                    "entries": len(self.entries)}
+
+
+# Requests sent inside bypass() on this thread always go to the backend, their responses still refresh the cache
+class _Bypass(threading.local):
+    active = False
+
+
+_bypass = _Bypass()
+
+
+@contextmanager
+def bypass():
+    previous, _bypass.active = _bypass.active, True
+    try:
+        yield
+    finally:
+        _bypass.active = previous
+
+
+_cache = None
+_cache_scope = None
+_cache_lock = threading.Lock()
+
+
+# Use the cache of a scope, ex: a test node id, a module name or "session", a new scope starts an empty cache.
+# Returns None when the cache is disabled in the [cache] section of config.ini
+def activate(scope):
+    global _cache, _cache_scope
+    with _cache_lock:
+        if not utilities.read_bool_config("cache", "enabled"):
+            _cache, _cache_scope = None, None
+        elif _cache is None or _cache_scope != scope:
+            _cache = ResponseCache(max_entries=utilities.read_int_config("cache", "max_entries"),
+                                   ttl=utilities.read_float_config("cache", "ttl"))
+            _cache_scope = scope
+        return _cache
+
+
+def get_response_cache():
+    return _cache
@@ -0,0 +1,135 @@
+import threading
+import time
+import weakref
+
+from selenium.common import TimeoutException, NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.support import expected_conditions
+
+# Waits finished since the last pop per driver, one dict per wait. Records of drivers nobody pops,
+# ex: a standalone page object's, go away with the driver
+_wait_records = weakref.WeakKeyDictionary()
+_wait_records_lock = threading.Lock()
+
+
+# Composable wait condition, calling it returns a truthy result when satisfied
+class Condition:
+    def __init__(self, description, check, locator=None, timeout=None):
+        self.description = description
+        self.check = check
+        self.locator = locator
+        self.timeout = timeout
+
+    def __call__(self, driver):
+        try:
+            return self.check(driver)
+        except (NoSuchElementException, StaleElementReferenceException):
+            return False
+
+    def __and__(self, other):
+        return Condition(f"({self.description} and {other.description})",
+                         lambda driver: self(driver) and other(driver),
+                         self.locator or other.locator, _max_timeout(self.timeout, other.timeout))
+
+    def __or__(self, other):
+        return Condition(f"({self.description} or {other.description})",
+                         lambda driver: self(driver) or other(driver),
+                         self.locator or other.locator, _max_timeout(self.timeout, other.timeout))
+
+
+# Conditions
+def present(locator, timeout=None):
+    return Condition(f"{locator} present", expected_conditions.presence_of_element_located(locator),
+                     locator, timeout)
+
+
+def visible(locator, timeout=None):
+    return Condition(f"{locator} visible", expected_conditions.visibility_of_element_located(locator),
+                     locator, timeout)
+
+
+def clickable(locator, timeout=None):
+    return Condition(f"{locator} clickable", expected_conditions.element_to_be_clickable(locator),
+                     locator, timeout)
+
+
+def text_equals(locator, text, timeout=None):
+    def check(driver):
+        element = driver.find_element(*locator)
+        return element if element.text.strip() == text else False
+    return Condition(f"{locator} text equals '{text}'", check, locator, timeout)
+
+
+def attribute_contains(locator, attribute, value, timeout=None):
+    def check(driver):
+        element = driver.find_element(*locator)
+        return element if value in (element.get_attribute(attribute) or "") else False
+    return Condition(f"{locator} attribute '{attribute}' contains '{value}'", check, locator, timeout)
+
+
+def alert_present(timeout=None):
+    return Condition("alert present", expected_conditions.alert_is_present(), timeout=timeout)
+
+
+# The window left its previous page and finished loading the url, ex: a tab opened on about:blank
+def page_loaded(url, timeout=None):
+    def check(driver):
+        return driver.current_url.startswith(url) and driver.execute_script("return document.readyState") == "complete"
+    return Condition(f"page {url} loaded", check, timeout=timeout)
+
+
+# Polls conditions with growing intervals until they are satisfied or timeout expires
+class WaitEngine:
+    def __init__(self, driver, default_timeout, initial_poll=0.05, max_poll=0.5, poll_backoff=1.5):
+        self.driver = driver
+        self.default_timeout = default_timeout
+        self.initial_poll = initial_poll
+        self.max_poll = max_poll
+        self.poll_backoff = poll_backoff
+        # Timeouts for specific locators, ex: a slow loading widget
+        self.locator_timeouts = {}
+
+    def until(self, condition, timeout=None):
+        timeout = self.get_timeout(condition, timeout)
+        start = time.perf_counter()
+        deadline = start + timeout
+        poll_interval = self.initial_poll
+        polls = 0
+        while True:
+            polls += 1
+            result = condition(self.driver)
+            if result:
+                _record_wait(self.driver, condition, timeout, time.perf_counter() - start, polls, False)
+                return result
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                elapsed = time.perf_counter() - start
+                _record_wait(self.driver, condition, timeout, elapsed, polls, True)
+                raise TimeoutException(f"Waited {elapsed:.2f}s for {condition.description}")
+            time.sleep(min(poll_interval, remaining))
+            poll_interval = min(poll_interval * self.poll_backoff, self.max_poll)
+
+    # Explicit timeout wins over the condition timeout, then the locator timeout, then the default
+    def get_timeout(self, condition, timeout=None):
+        if timeout is not None:
+            return timeout
+        if condition.timeout is not None:
+            return condition.timeout
+        return self.locator_timeouts.get(condition.locator, self.default_timeout)
+
+
+# Return and clear the waits of the driver recorded so far
+def pop_wait_records(driver):
+    with _wait_records_lock:
+        return _wait_records.pop(driver, [])
+
+
+def _record_wait(driver, condition, timeout, elapsed, polls, timed_out):
+    with _wait_records_lock:
+        _wait_records.setdefault(driver, []).append({"condition": condition.description, "timeout": timeout,
+                              "elapsed": round(elapsed, 3), "polls": polls, "timed_out": timed_out})
+
+
+def _max_timeout(timeout, other_timeout):
+    if timeout is None or other_timeout is None:
+        return timeout if other_timeout is None else other_timeout
+    return max(timeout, other_timeout)
@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import shutil
+import stat
+import threading
+import time
+
+from selenium import webdriver
+from selenium.common import WebDriverException, NoAlertPresentException
+from selenium.webdriver import ChromeOptions, FirefoxOptions, EdgeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.firefox.service import Service as FirefoxService
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.firefox import GeckoDriverManager
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+from src.utilities import utilities
+
+DRIVER_MANAGERS = {"chrome": ChromeDriverManager,
+                   "firefox": GeckoDriverManager,
+                   "edge": EdgeChromiumDriverManager}
+
+# Driver binaries already resolved by this process
+_resolved_driver_paths = {}
+_resolve_lock = threading.Lock()
+
+
+# Launch a new browser session and open the web base url
+def create_driver(browser, headless, web_base_url):
+    if browser.casefold() == "chrome":
+        options = ChromeOptions()
+        if headless: options.add_argument("--headless")
+        driver = webdriver.Chrome(options=options, service=ChromeService(resolve_driver_binary("chrome")))
+
+    elif browser.casefold() == "firefox":
+        options = FirefoxOptions()
+        if headless: options.add_argument("--headless")
+        driver = webdriver.Firefox(options=options, service=FirefoxService(resolve_driver_binary("firefox")))
+
+    elif browser.casefold() == "edge":
+        options = EdgeOptions()
+        if headless: options.add_argument("--headless")
+        driver = webdriver.Edge(options=options, service=EdgeService(resolve_driver_binary("edge")))
+    else:
+        raise Exception("Browser name is not correct.")
+
+    driver.maximize_window()
+    # Explicit waits from WaitHelper are used instead, an implicit wait would stack with them
+    driver.implicitly_wait(utilities.read_float_config("web", "implicit_wait"))
+    driver.get(web_base_url)
+    return driver
+
+
+# Return driver binary path for the browser, resolved once per process and shared between workers
+def resolve_driver_binary(browser):
+    browser = browser.casefold()
+    with _resolve_lock:
+        if browser not in _resolved_driver_paths:
+            if utilities.read_bool_config("webdriver", "offline"):
+                _resolved_driver_paths[browser] = _read_pinned_driver_binary(browser)
+            else:
+                _resolved_driver_paths[browser] = _read_cached_driver_binary(browser)
+        return _resolved_driver_paths[browser]
+
+
+def _read_pinned_driver_binary(browser):
+    driver_path = utilities.read_configs("webdriver", f"{browser}_driver_path").strip()
+    if not driver_path or not os.path.isfile(driver_path):
+        raise Exception(f"Offline mode needs an existing {browser}_driver_path in config.ini, got: '{driver_path}'")
+    return driver_path
+
+
+# Local cache keyed by binary content hash, the manifest maps each browser to its current binary
+def _read_cached_driver_binary(browser):
+    cache_dir = os.path.expanduser(utilities.read_configs("webdriver", "cache_dir"))
+    cache_valid_seconds = utilities.read_float_config("webdriver", "cache_valid_days") * 24 * 60 * 60
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+
+    # First worker resolves the binary while the others wait and then read the manifest
+    with utilities.file_lock(os.path.join(cache_dir, ".lock")):
+        manifest = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as manifest_file:
+                manifest = json.load(manifest_file)
+        entry = manifest.get(browser)
+        if (entry and os.path.isfile(entry["path"]) and os.path.getsize(entry["path"]) == entry["size"]
+                and time.time() - entry["resolved_at"] < cache_valid_seconds):
+            return entry["path"]
+
+        installed_path = DRIVER_MANAGERS[browser]().install()
+        with open(installed_path, "rb") as driver_file:
+            digest = hashlib.sha256(driver_file.read()).hexdigest()
+        cached_path = os.path.join(cache_dir, digest, os.path.basename(installed_path))
+        if not os.path.isfile(cached_path):
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            shutil.copy2(installed_path, cached_path + ".tmp")
+            os.replace(cached_path + ".tmp", cached_path)
+            os.chmod(cached_path, os.stat(cached_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+        manifest[browser] = {"path": cached_path, "sha256": digest,
+                             "size": os.path.getsize(cached_path), "resolved_at": time.time()}
+        with open(manifest_path + ".tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+        return cached_path
+
+
+# Pool of warm browsers for one worker, browsers are reset between tests instead of relaunched
+class WebDriverPool:
+    def __init__(self, browser, headless, web_base_url, max_idle=1, max_uses=50):
+        self.browser = browser
+        self.headless = headless
+        self.web_base_url = web_base_url
+        self.max_idle = max_idle
+        self.max_uses = max_uses
+        self.lock = threading.Lock()
+        self.idle_drivers = []
+        self.uses = {}
+
+        # Metrics
+        self.launches = 0
+        self.fresh_launches = 0
+        self.reuses = 0
+        self.recycles = 0
+
+    # Hand out a healthy warm browser or launch a new one
+    def acquire(self):
+        while True:
+            with self.lock:
+                driver = self.idle_drivers.pop() if self.idle_drivers else None
+            if driver is None:
+                return self._launch()
+            if self.is_healthy(driver):
+                with self.lock:
+                    self.reuses += 1
+                    self.uses[driver] += 1
+                return driver
+            self._recycle(driver)
+
+    # Reset the browser state and keep it for the next test, recycle it if reset fails
+    def release(self, driver):
+        if self.uses.get(driver, 0) >= self.max_uses or not self.reset(driver) or not self.is_clean(driver):
+            self._recycle(driver)
+            return
+        with self.lock:
+            if len(self.idle_drivers) < self.max_idle:
+                self.idle_drivers.append(driver)
+                return
+        self._quit(driver)
+
+    # Launch a browser outside of the pool for tests marked with fresh_browser
+    def launch_fresh(self):
+        with self.lock:
+            self.fresh_launches += 1
+        return create_driver(self.browser, self.headless, self.web_base_url)
+
+    def reset(self, driver):
+        try:
+            try:
+                driver.switch_to.alert.dismiss()
+            except NoAlertPresentException:
+                pass
+            # Close every window except the first one
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # Cookies and storage are cleared for the origin of the current page, so the browser goes back to the
+            # site under test first. Pages like about:blank or data: URLs have no storage and the script would fail
+            driver.get(self.web_base_url)
+            driver.delete_all_cookies()
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def is_clean(self, driver):
+        try:
+            return len(driver.window_handles) == 1 and driver.current_url.startswith(self.web_base_url)
+        except WebDriverException:
+            return False
+
+    def stats(self):
+        with self.lock:
+            return {"launches": self.launches,
+                    "fresh_launches": self.fresh_launches,
+                    "reuses": self.reuses,
+                    "recycles": self.recycles}
+
+    def close(self):
+        with self.lock:
+            idle_drivers, self.idle_drivers = self.idle_drivers, []
+        for driver in idle_drivers:
+            self._quit(driver)
+
+    def _launch(self):
+        driver = create_driver(self.browser, self.headless, self.web_base_url)
+        with self.lock:
+            self.launches += 1
+            self.uses[driver] = 1
+        return driver
+
+    def _recycle(self, driver):
+        with self.lock:
+            self.recycles += 1
+        self._quit(driver)
+
+    def _quit(self, driver):
+        with self.lock:
+            self.uses.pop(driver, None)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+
+# Capture screenshot, page source and browser console of a failing test, returned as (name, artifact path) links
+def capture_failure_artifacts(driver, artifact_writer):
+    artifacts = []
+    try:
+        artifacts.append(("Screenshot", artifact_writer.submit_screenshot(driver.get_screenshot_as_base64())))
+        artifacts.append(("Page source", artifact_writer.submit_text(driver.page_source, ".html")))
+    except WebDriverException:
+        # Browser is gone, ex: it crashed during the test
+        return artifacts
+    # Only chromium based drivers expose the browser console
+    if hasattr(driver, "get_log"):
+        try:
+            console_log = "\n".join(json.dumps(entry) for entry in driver.get_log("browser"))
+            artifacts.append(("Console log", artifact_writer.submit_text(console_log, ".txt")))
+        except WebDriverException:
+            pass
+    return artifacts
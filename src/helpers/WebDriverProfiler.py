@@ -0,0 +1,188 @@
+import os
+import sys
+import time
+
+from src.utilities import api_metrics
+
+SRC_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TESTS_PATH = os.path.abspath(os.path.join(SRC_PATH, "../tests"))
+PAGES_FILE = os.path.join(SRC_PATH, "helpers", "WebPagesHelper.py")
+SELENIUM_PATH = os.sep + "selenium" + os.sep
+SELENIUM_SUPPORT_PATH = SELENIUM_PATH + "webdriver" + os.sep + "support" + os.sep
+# Commands locating elements, their "using" and "value" params make the locator
+FIND_COMMANDS = {"findElement", "findElements", "findChildElement", "findChildElements"}
+# Commands loading a new document, lookups before them are not redundant with lookups after them
+NAVIGATION_COMMANDS = {"get", "goBack", "goForward", "refresh"}
+
+
+# Records every WebDriver command sent by a driver, including the ones sent through its elements
+class WebDriverProfiler:
+    def __init__(self, driver):
+        self.driver = driver
+        self.records = []
+        self.element_locators = {}
+        self.navigations = 0
+        self.profile = None
+
+    def start(self):
+        execute = self.driver.execute
+
+        def profiled_execute(driver_command, params=None):
+            start = time.perf_counter()
+            try:
+                return self._handle_response(driver_command, params, execute(driver_command, params))
+            finally:
+                self._record(driver_command, params, time.perf_counter() - start)
+
+        # Instance attribute shadows WebDriver.execute, WebElement commands go through it as well
+        self.driver.execute = profiled_execute
+        return self
+
+    # Stop recording and return the profile of the commands sent since start
+    def stop(self):
+        if self.profile is None:
+            self.driver.__dict__.pop("execute", None)
+            self.profile = summarize_commands(self.records)
+        return self.profile
+
+    def _handle_response(self, driver_command, params, response):
+        # Remember which locator each element came from so later element commands can show it
+        if driver_command in FIND_COMMANDS and response:
+            value = response.get("value")
+            locator = _get_locator(params)
+            for element in value if isinstance(value, list) else [value]:
+                if hasattr(element, "id"):
+                    self.element_locators[element.id] = locator
+        return response
+
+    def _record(self, driver_command, params, elapsed):
+        params = params or {}
+        if driver_command in FIND_COMMANDS:
+            locator = _get_locator(params)
+        else:
+            # Element commands carry the element id, scripts like get_attribute pass the element as an argument
+            element_ids = [params.get("id")] + [getattr(arg, "id", None) for arg in params.get("args", [])]
+            locator = next((self.element_locators[element_id] for element_id in element_ids
+                            if element_id in self.element_locators), "")
+        api_call, page_method, wait_id, stack = _inspect_stack(sys._getframe(2))
+        self.records.append({"command": driver_command,
+                             "api": api_call or driver_command,
+                             "locator": locator,
+                             "page_method": page_method,
+                             "wait_id": wait_id,
+                             "navigation": self.navigations,
+                             "stack": stack,
+                             "ms": round(elapsed * 1000, 3)})
+        if driver_command in NAVIGATION_COMMANDS:
+            self.navigations += 1
+
+
+# Walk the python stack of a command to find the selenium API called, the page object method and the test frames
+def _inspect_stack(frame):
+    api_call, page_method, wait_id, stack = None, None, None, []
+    while frame is not None:
+        file_name = frame.f_code.co_filename
+        if SELENIUM_PATH in file_name and not stack:
+            # Outermost selenium API frame before project code, ex: WebElement.get_attribute
+            if SELENIUM_SUPPORT_PATH not in file_name:
+                api_call = frame.f_code.co_qualname
+        elif file_name.startswith(SRC_PATH) or file_name.startswith(TESTS_PATH):
+            name = frame.f_code.co_qualname
+            if name.startswith("CachedElement."):
+                # Stale element retry wrapper, the selenium call around it is the one that matters
+                frame = frame.f_back
+                continue
+            stack.append(name)
+            if file_name == PAGES_FILE and "." in name and not name.startswith("PageFactory"):
+                page_method = name
+            if name == "WaitEngine.until":
+                # Polls of one wait are a single lookup, not repeated ones
+                wait_id = id(frame)
+        frame = frame.f_back
+    return api_call, page_method or (stack[-1] if stack else ""), wait_id, ";".join(reversed(stack))
+
+
+def _get_locator(params):
+    if not params or "using" not in params:
+        return ""
+    return f"{params['using']}={params['value']}"
+
+
+# Command count, slowest commands, repeated lookups and folded stacks of one test
+def summarize_commands(records, slowest=5):
+    commands = {}
+    folded = {}
+    lookups = {}
+    for record in records:
+        command = commands.setdefault(record["api"], {"api": record["api"], "count": 0, "total_ms": 0.0})
+        command["count"] += 1
+        command["total_ms"] = round(command["total_ms"] + record["ms"], 3)
+        stack = f"{record['stack']};{record['api']}" if record["stack"] else record["api"]
+        folded[stack] = round(folded.get(stack, 0.0) + record["ms"], 3)
+        if record["command"] in FIND_COMMANDS:
+            lookup = lookups.setdefault((record["navigation"], record["locator"]),
+                                        {"locator": record["locator"], "waits": set(), "count": 0, "methods": set()})
+            lookup["count"] += 1
+            lookup["waits"].add(record["wait_id"] if record["wait_id"] is not None else object())
+            lookup["methods"].add(record["page_method"])
+    redundant_lookups = [{"locator": lookup["locator"],
+                          "count": len(lookup["waits"]),
+                          "commands": lookup["count"],
+                          "methods": ", ".join(sorted(lookup["methods"]))}
+                         for lookup in lookups.values() if len(lookup["waits"]) > 1]
+    return {"commands": len(records),
+            "total_ms": round(sum(record["ms"] for record in records), 3),
+            "by_command": sorted(commands.values(), key=lambda command: command["total_ms"], reverse=True),
+            "slowest": [{key: record[key] for key in ("api", "locator", "page_method", "ms")}
+                        for record in sorted(records, key=lambda record: record["ms"], reverse=True)[:slowest]],
+            "redundant_lookups": sorted(redundant_lookups, key=lambda lookup: lookup["count"], reverse=True),
+            "folded": folded}
+
+
+def render_html_summary(profile):
+    parts = [f"<div>WebDriver commands: {profile['commands']} in {profile['total_ms']} ms</div>",
+             api_metrics.render_html_table(profile["slowest"], SLOWEST_COLUMNS)]
+    if profile["redundant_lookups"]:
+        parts.append("<div>Repeated lookups of the same locator on the same page:</div>")
+        parts.append(api_metrics.render_html_table(profile["redundant_lookups"], REDUNDANT_LOOKUP_COLUMNS))
+    return "".join(parts)
+
+
+# Aggregate folded stacks and command totals of all tests, fed from report user properties
+class WebDriverProfileSession:
+    def __init__(self):
+        self.folded = {}
+        self.commands = {}
+        self.redundant_lookups = 0
+
+    def add_test_profile(self, profile):
+        for stack, elapsed_ms in profile["folded"].items():
+            self.folded[stack] = round(self.folded.get(stack, 0.0) + elapsed_ms, 3)
+        for command in profile["by_command"]:
+            total = self.commands.setdefault(command["api"], {"api": command["api"], "count": 0, "total_ms": 0.0})
+            total["count"] += command["count"]
+            total["total_ms"] = round(total["total_ms"] + command["total_ms"], 3)
+        self.redundant_lookups += len(profile["redundant_lookups"])
+
+    # Brendan Gregg's folded format, one "frame;frame;command microseconds" line per stack
+    def export_folded(self, folded_file_path):
+        with open(folded_file_path, "w") as folded_file:
+            for stack, elapsed_ms in sorted(self.folded.items()):
+                folded_file.write(f"{stack} {round(elapsed_ms * 1000)}\n")
+
+    def get_top_stacks(self, limit=10):
+        top_stacks = sorted(self.folded.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"stack": stack, "total_ms": elapsed_ms} for stack, elapsed_ms in top_stacks]
+
+    def render_html_summary(self):
+        commands = sorted(self.commands.values(), key=lambda command: command["total_ms"], reverse=True)
+        return (f"<h2>WebDriver profile</h2><div>Redundant lookups: {self.redundant_lookups}</div>"
+                + api_metrics.render_html_table(commands, COMMAND_COLUMNS)
+                + api_metrics.render_html_table(self.get_top_stacks(), STACK_COLUMNS))
+
+
+SLOWEST_COLUMNS = [("Command", "api"), ("Locator", "locator"), ("Page method", "page_method"), ("ms", "ms")]
+REDUNDANT_LOOKUP_COLUMNS = [("Locator", "locator"), ("Lookups", "count"), ("Commands", "commands"),
+                            ("Page methods", "methods")]
+COMMAND_COLUMNS = [("Command", "api"), ("Count", "count"), ("Total ms", "total_ms")]
+STACK_COLUMNS = [("Stack", "stack"), ("Total ms", "total_ms")]
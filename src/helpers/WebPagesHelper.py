@@ -1,21 +1,74 @@
-from selenium.common import TimeoutException, NoAlertPresentException
+from selenium.common import TimeoutException, NoAlertPresentException, StaleElementReferenceException
 from selenium.webdriver import ActionChains
 
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.remote.webelement import WebElement
+
+from src.helpers import WaitHelper
+from src.utilities import utilities
 
 
 # Custom class to contain reusable classes by other classes
 class PageFactory:
     def __init__(self, driver):
         self.driver = driver
-        self.wait = WebDriverWait(self.driver, 2)
+        self.wait = WaitHelper.WaitEngine(
+            self.driver,
+            default_timeout=utilities.read_float_config("web", "explicit_wait"),
+            initial_poll=utilities.read_float_config("web", "wait_initial_poll"),
+            max_poll=utilities.read_float_config("web", "wait_max_poll"))
+        self.alert_timeout = utilities.read_float_config("web", "alert_wait")
+        self.absence_timeout = utilities.read_float_config("web", "absence_wait")
         self.actions = ActionChains(self.driver)
+        # Element handles resolved by this page object, keyed by locator
+        self.elements = {}
+
+    def get_element(self, locator, cached=True):
+        if cached and locator in self.elements:
+            return self.elements[locator]
+        element = CachedElement(self.find_element(locator), lambda: self.find_element(locator))
+        self.elements[locator] = element
+        return element
+
+    # Resolve several locators with one script round-trip, returned in the same order
+    def get_elements(self, *locators):
+        missing_locators = [locator for locator in locators if locator not in self.elements]
+        if missing_locators:
+            found_elements = self.driver.execute_script(FIND_ELEMENTS_SCRIPT, [list(locator)
+                                                                               for locator in missing_locators])
+            for locator, element in zip(missing_locators, found_elements):
+                if element is None:
+                    # Not there yet, fall back to waiting for this locator alone
+                    self.get_element(locator)
+                else:
+                    self.elements[locator] = CachedElement(element, lambda locator=locator: self.find_element(locator))
+        return [self.elements[locator] for locator in locators]
+
+    # Wait for the element to be present instead of relying on a global implicit wait, timeout overrides the
+    # locator and default timeouts for this call
+    def find_element(self, locator, timeout=None):
+        return self.wait_for(WaitHelper.present(locator), timeout)
+
+    # Absence checks expect the element not to be there, so they give up after the short absence_wait
+    def is_element_present(self, locator, timeout=None):
+        try:
+            self.find_element(locator, self.absence_timeout if timeout is None else timeout)
+            return True
+        except TimeoutException:
+            return False
+
+    def wait_for(self, condition, timeout=None):
+        return self.wait.until(condition, timeout)
 
-    def get_element(self, locator):
-        selector, value = locator
-        return self.driver.find_element(selector, value)
+    def set_locator_timeout(self, locator, timeout):
+        self.wait.locator_timeouts[locator] = timeout
+
+    # Drop cached handles after navigation, all of them if no locator is given
+    def invalidate_elements(self, *locators):
+        if not locators:
+            self.elements.clear()
+        for locator in locators:
+            self.elements.pop(locator, None)
 
     @staticmethod
     def get_element_children(parent, children_locator):
@@ -24,17 +77,124 @@ class PageFactory:
 
     def click_on_element_using_actions(self, locator):
         element = self.get_element(locator)
-        self.actions.move_to_element(element).click(element).perform()
+        try:
+            self.actions.move_to_element(element).click(element).perform()
+        except StaleElementReferenceException:
+            # Actions are sent by the driver not the element, so re-resolve the element here
+            self.actions.reset_actions()
+            element = self.get_element(locator, cached=False)
+            self.actions.move_to_element(element).click(element).perform()
 
     def type_into_element(self, locator, text):
-        self.get_element(locator).clear()
-        self.get_element(locator).send_keys(text)
+        element = self.get_element(locator)
+        element.clear()
+        element.send_keys(text)
 
     def get_element_attribute(self, locator, attribute):
         return self.get_element(locator).get_attribute(attribute)
 
     def get_alert(self):
-        return self.wait.until(expected_conditions.alert_is_present())
+        return self.wait_for(WaitHelper.alert_present(self.alert_timeout))
+
+    # Read a whole ARIA or HTML table in one script round-trip instead of one call per cell
+    # Elements passed to scripts are not re-resolved by CachedElement, a stale table is looked up again here
+    def get_table(self, locator):
+        try:
+            table_data = self.driver.execute_script(READ_TABLE_SCRIPT, self.get_element(locator))
+        except StaleElementReferenceException:
+            table_data = self.driver.execute_script(READ_TABLE_SCRIPT, self.get_element(locator, cached=False))
+        return TableSnapshot(table_data["headers"], table_data["rows"])
+
+
+# Element handle that re-resolves its locator once when the browser reports it as stale
+class CachedElement(WebElement):
+    def __init__(self, element, resolve):
+        super().__init__(element.parent, element.id)
+        self._resolve = resolve
+
+    # Commands of the element, get_dom_attribute included
+    def _execute(self, command, params=None):
+        return self._retry_if_stale(super()._execute, command, params)
+
+    # Selenium reads these through driver.execute_script instead of an element command
+    def get_attribute(self, name):
+        return self._retry_if_stale(super().get_attribute, name)
+
+    def is_displayed(self):
+        return self._retry_if_stale(super().is_displayed)
+
+    def _retry_if_stale(self, call, *args):
+        try:
+            return call(*args)
+        except StaleElementReferenceException:
+            self._id = self._resolve().id
+            return call(*args)
+
+
+# Script returning the first element matching each [selector, value] locator or null
+FIND_ELEMENTS_SCRIPT = """
+const findElement = ([selector, value]) => {
+    switch (selector) {
+        case "id": return document.getElementById(value);
+        case "css selector": return document.querySelector(value);
+        case "class name": return document.getElementsByClassName(value)[0] || null;
+        case "name": return document.getElementsByName(value)[0] || null;
+        case "tag name": return document.getElementsByTagName(value)[0] || null;
+        case "xpath": return document.evaluate(value, document, null,
+                                               XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case "link text": return Array.from(document.querySelectorAll("a"))
+            .find((link) => link.innerText.trim() === value) || null;
+        case "partial link text": return Array.from(document.querySelectorAll("a"))
+            .find((link) => link.innerText.includes(value)) || null;
+        default: throw new Error("Unsupported locator strategy: " + selector);
+    }
+};
+return arguments[0].map(findElement);
+"""
+
+
+# Script returning table headers and rows text as arrays, arguments[0] is the table element
+READ_TABLE_SCRIPT = """
+const table = arguments[0];
+const headerSelector = "[role='columnheader'], th";
+const cellSelector = "[role='columnheader'], [role='rowheader'], [role='cell'], [role='gridcell'], th, td";
+const text = (element) => (element.innerText || element.textContent || "").trim();
+const headers = [];
+const rows = [];
+for (const row of table.querySelectorAll("[role='row'], tr")) {
+    const cells = Array.from(row.children).filter((cell) => cell.matches(cellSelector));
+    if (headers.length === 0 && cells.length > 0 && cells.every((cell) => cell.matches(headerSelector))) {
+        headers.push(...cells.map(text));
+    } else if (cells.length > 0) {
+        rows.push(cells.map(text));
+    }
+}
+return {headers: headers, rows: rows};
+"""
+
+
+# Snapshot of a table as lists of strings with lookups by header name
+class TableSnapshot:
+    def __init__(self, headers, rows):
+        self.headers = headers
+        self.rows = rows
+        self.header_indexes = {header: index for index, header in enumerate(headers)}
+
+    def get_column(self, header):
+        index = self.header_indexes[header]
+        return [row[index] if index < len(row) else "" for row in self.rows]
+
+    # Return first row where column equals value as {header: cell}, None if not found
+    def get_row(self, column, value):
+        index = self.header_indexes[column]
+        for row in self.rows:
+            if index < len(row) and row[index] == value:
+                return dict(zip(self.headers, row))
+        return None
+
+    def get_cell(self, row_column, row_value, column):
+        row = self.get_row(row_column, row_value)
+        return row.get(column) if row is not None else None
 
 
 class HomePage:
@@ -52,18 +212,22 @@ class HomePage:
     # Return the class of the page navigated to
     def go_to_class_attribute_page(self):
         self.page_factory.get_element(self.class_attribute_button).click()
+        self.page_factory.invalidate_elements()
         return ClassAttributePage(self.driver)
 
     def go_to_click_page(self):
         self.page_factory.get_element(self.click_button).click()
+        self.page_factory.invalidate_elements()
         return ClickPage(self.driver)
 
     def go_to_dynamic_table_page(self):
         self.page_factory.get_element(self.dynamic_table_button).click()
+        self.page_factory.invalidate_elements()
         return DynamicTablePage(self.driver)
 
     def go_to_sample_app_page(self):
         self.page_factory.get_element(self.sample_app_button).click()
+        self.page_factory.invalidate_elements()
         return SampleAppPage(self.driver)
 
 
@@ -117,10 +281,6 @@ class DynamicTablePage:
         # Locators
         self.chrome_cpu_label = (By.CLASS_NAME, "bg-warning")
         self.dynamic_table = (By.CSS_SELECTOR, "[role='table'][aria-label='Tasks']")
-        self.table_row_groups = (By.CSS_SELECTOR, "[role='rowgroup']")
-        self.table_headers_columns = (By.CSS_SELECTOR, "[role='columnheader']")
-        self.table_cells_rows = (By.CSS_SELECTOR, "[role='row']")
-        self.table_cells = (By.CSS_SELECTOR, "[role='cell']")
 
     # Methods
     def get_chrome_cpu_value_from_label(self):
@@ -129,27 +289,10 @@ class DynamicTablePage:
         return chrome_cpu_label_text.split(":")[1].strip()
 
     def get_chrome_cpu_value_from_table(self):
-        dynamic_table = self.page_factory.get_element(self.dynamic_table)
-        table_row_groups = self.page_factory.get_element_children(
-            dynamic_table, self.table_row_groups)
-        # Split row groups array from the table
-        table_headers_row_group = table_row_groups[0]
-        table_cells_row_group = table_row_groups[1]
-
-        table_headers_columns = self.page_factory.get_element_children(
-            table_headers_row_group, self.table_headers_columns)
-        table_cells_rows = self.page_factory.get_element_children(
-            table_cells_row_group, self.table_cells_rows)
-        # Loop over the dynamic table headers to get the index of CPU header
-        cpu_column_index = [i for i, column in enumerate(table_headers_columns) if column.text == "CPU"][0]
-        chrome_cpu_table_value = ""
-        # Loop to get Chrome row then get it's CPU column value
-        for row in table_cells_rows:
-            cells = self.page_factory.get_element_children(row, self.table_cells)
-            name_cell = cells[0]
-            if name_cell.text == "Chrome":
-                chrome_cpu_table_value = cells[cpu_column_index].text.strip()
-        return chrome_cpu_table_value
+        dynamic_table = self.page_factory.get_table(self.dynamic_table)
+        # Get Chrome row then get it's CPU column value
+        chrome_cpu_table_value = dynamic_table.get_cell("Name", "Chrome", "CPU")
+        return chrome_cpu_table_value.strip() if chrome_cpu_table_value is not None else ""
 
 
 class SampleAppPage:
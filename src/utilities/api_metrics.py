@@ -0,0 +1,150 @@
+import html
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+PHASES = ["dns_connect", "ttfb", "download", "json_parse", "schema_validation"]
+
+_thread_state = threading.local()
+_records = []
+_records_lock = threading.Lock()
+
+
+# Timings and sizes of one HTTP call, phases in milliseconds
+def new_call_record(operation, method, url):
+    return {"operation": operation,
+            "method": method,
+            "endpoint": get_endpoint_template(url),
+            "status_code": None,
+            "total_ms": 0.0,
+            **{f"{phase}_ms": 0.0 for phase in PHASES},
+            "request_bytes": 0,
+            "response_bytes": 0}
+
+
+# Store the record as the current call of this thread, json parse and validation are added to it afterwards
+def add_call_record(record):
+    _thread_state.current_record = record
+    with _records_lock:
+        _records.append(record)
+
+
+# Following json parse and validation belong to no call, ex: the response came from the cache
+def clear_current_record():
+    _thread_state.current_record = None
+
+
+def add_phase_time(phase, elapsed):
+    record = getattr(_thread_state, "current_record", None)
+    if record is not None:
+        record[f"{phase}_ms"] = round(record[f"{phase}_ms"] + elapsed * 1000, 3)
+        record["total_ms"] = round(record["total_ms"] + elapsed * 1000, 3)
+
+
+def add_response_bytes(size):
+    record = getattr(_thread_state, "current_record", None)
+    if record is not None:
+        record["response_bytes"] += size
+
+
+# Return and clear the calls recorded so far
+def pop_call_records():
+    _thread_state.current_record = None
+    with _records_lock:
+        records = list(_records)
+        _records.clear()
+    return records
+
+
+# Context manager timing a phase of the current call
+class timed_phase:
+    def __init__(self, phase):
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        add_phase_time(self.phase, time.perf_counter() - self.start)
+
+
+# Replace ids in url path so calls to the same endpoint are grouped, ex: /v2/pet/12 -> /v2/pet/{id}
+def get_endpoint_template(url):
+    return re.sub(r"/\d+(?=/|$)", "/{id}", urlsplit(url).path)
+
+
+def get_request_size(prepared_request):
+    headers_size = sum(len(key) + len(value) + 4 for key, value in prepared_request.headers.items())
+    body = prepared_request.body or b""
+    body_size = len(body.encode() if isinstance(body, str) else body)
+    return len(prepared_request.method) + len(prepared_request.path_url) + 11 + headers_size + 2 + body_size
+
+
+# Body of a streamed response is not read yet, its bytes are added with add_response_bytes while it's consumed
+def get_response_size(response, streamed=False):
+    headers_size = sum(len(key) + len(value) + 4 for key, value in response.headers.items())
+    return 17 + len(response.reason or "") + headers_size + 2 + (0 if streamed else len(response.content))
+
+
+# Aggregate calls of all tests, fed from report user properties so it also works under pytest-xdist
+class APIMetricsSession:
+    def __init__(self):
+        self.tests = {}
+
+    def add_test_calls(self, nodeid, records):
+        self.tests.setdefault(nodeid, []).extend(records)
+
+    def get_endpoint_stats(self):
+        endpoints = {}
+        for records in self.tests.values():
+            for record in records:
+                endpoints.setdefault(f"{record['method']} {record['endpoint']}", []).append(record)
+        endpoint_stats = []
+        for endpoint, records in endpoints.items():
+            totals = sorted(record["total_ms"] for record in records)
+            endpoint_stats.append({
+                "endpoint": endpoint,
+                "calls": len(records),
+                "avg_total_ms": round(sum(totals) / len(totals), 2),
+                "p95_total_ms": totals[min(len(totals) - 1, int(len(totals) * 0.95))],
+                "max_total_ms": totals[-1],
+                **{f"avg_{phase}_ms": round(sum(record[f"{phase}_ms"] for record in records) / len(records), 2)
+                   for phase in PHASES},
+                "avg_response_bytes": round(sum(record["response_bytes"] for record in records) / len(records))})
+        return sorted(endpoint_stats, key=lambda stats: stats["avg_total_ms"], reverse=True)
+
+    def export_json(self, json_file_path):
+        with open(json_file_path, "w") as json_file:
+            json.dump({"endpoints": self.get_endpoint_stats(), "tests": self.tests}, json_file, indent=2)
+
+
+def summarize_test_calls(records):
+    summary = {"calls": len(records),
+               "total_ms": round(sum(record["total_ms"] for record in records), 2),
+               "request_bytes": sum(record["request_bytes"] for record in records),
+               "response_bytes": sum(record["response_bytes"] for record in records)}
+    for phase in PHASES:
+        summary[f"{phase}_ms"] = round(sum(record[f"{phase}_ms"] for record in records), 2)
+    return summary
+
+
+def render_html_table(rows, columns):
+    header = "".join(f"<th>{html.escape(title)}</th>" for title, _ in columns)
+    body = "".join("<tr>" + "".join(f"<td>{html.escape(str(row[key]))}</td>" for _, key in columns) + "</tr>"
+                   for row in rows)
+    return f'<table class="api-metrics"><tr>{header}</tr>{body}</table>'
+
+
+TEST_CALL_COLUMNS = [("Operation", "operation"), ("Method", "method"), ("Endpoint", "endpoint"),
+                     ("Status", "status_code"), ("Total ms", "total_ms"), ("DNS/connect ms", "dns_connect_ms"),
+                     ("TTFB ms", "ttfb_ms"), ("Download ms", "download_ms"), ("JSON parse ms", "json_parse_ms"),
+                     ("Validation ms", "schema_validation_ms"), ("Request bytes", "request_bytes"),
+                     ("Response bytes", "response_bytes")]
+ENDPOINT_COLUMNS = [("Endpoint", "endpoint"), ("Calls", "calls"), ("Avg ms", "avg_total_ms"),
+                    ("P95 ms", "p95_total_ms"), ("Max ms", "max_total_ms"),
+                    ("Avg DNS/connect ms", "avg_dns_connect_ms"), ("Avg TTFB ms", "avg_ttfb_ms"),
+                    ("Avg download ms", "avg_download_ms"), ("Avg JSON parse ms", "avg_json_parse_ms"),
+                    ("Avg validation ms", "avg_schema_validation_ms"), ("Avg response bytes", "avg_response_bytes")]
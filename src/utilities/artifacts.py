@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import io
+import os
+import pathlib
+import queue
+import shutil
+import threading
+
+from PIL import Image
+
+from src.utilities import utilities
+
+ARTIFACTS_DIRECTORY = "artifacts"
+ARTIFACTS_PATH = os.path.join(utilities.RESULTS_PATH, ARTIFACTS_DIRECTORY)
+# Directory of the HTML report, artifact links are relative to it
+_report_directory = utilities.RESULTS_PATH
+
+
+# Writes failure artifacts on a background thread, identical captures are written once
+class ArtifactWriter:
+    def __init__(self, artifacts_path=ARTIFACTS_PATH, max_width=1280, jpeg_quality=70, report_directory=None):
+        self.artifacts_path = artifacts_path
+        self.links_prefix = get_links_prefix(artifacts_path, report_directory or _report_directory)
+        self.max_width = max_width
+        self.jpeg_quality = jpeg_quality
+        self.pid = os.getpid()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.file_names = set()
+        self.captured = 0
+        self.deduplicated = 0
+        self.bytes_written = 0
+
+    # Returns the artifact link relative to the HTML report, the file itself is written later
+    def submit_screenshot(self, screenshot_base64):
+        return self._submit(screenshot_base64.encode(), ".jpg", self._encode_screenshot)
+
+    def submit_text(self, text, extension):
+        return self._submit(text.encode(), extension, None)
+
+    def _submit(self, payload, extension, encode):
+        file_name = hashlib.sha256(payload).hexdigest()[:24] + extension
+        with self.lock:
+            self.captured += 1
+            if file_name in self.file_names:
+                self.deduplicated += 1
+                return f"{self.links_prefix}/{file_name}"
+            self.file_names.add(file_name)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._write_artifacts, name="artifact-writer", daemon=True)
+                self.thread.start()
+        self.queue.put((file_name, payload, encode))
+        return f"{self.links_prefix}/{file_name}"
+
+    def _write_artifacts(self):
+        while True:
+            artifact = self.queue.get()
+            if artifact is None:
+                return
+            file_name, payload, encode = artifact
+            try:
+                content = encode(payload) if encode is not None else payload
+                os.makedirs(self.artifacts_path, exist_ok=True)
+                # Another worker may write the same capture, replace is atomic so readers never see half a file
+                temporary_file_path = os.path.join(self.artifacts_path, f".{file_name}.{self.pid}.tmp")
+                with open(temporary_file_path, "wb") as artifact_file:
+                    artifact_file.write(content)
+                os.replace(temporary_file_path, os.path.join(self.artifacts_path, file_name))
+                with self.lock:
+                    self.bytes_written += len(content)
+            except Exception as exception:
+                utilities.custom_logger().warning(f"Could not write artifact {file_name}: {exception!r}")
+
+    # Decode, downscale and compress to jpeg
+    def _encode_screenshot(self, screenshot_base64):
+        png = base64.b64decode(screenshot_base64)
+        image = Image.open(io.BytesIO(png)).convert("RGB")
+        if image.width > self.max_width:
+            image = image.resize((self.max_width, round(image.height * self.max_width / image.width)))
+        jpeg = io.BytesIO()
+        image.save(jpeg, "JPEG", quality=self.jpeg_quality, optimize=True)
+        return jpeg.getvalue()
+
+    # Wait for queued artifacts to be written
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        with self.lock:
+            return {"captured": self.captured,
+                    "deduplicated": self.deduplicated,
+                    "written": len(self.file_names),
+                    "bytes_written": self.bytes_written}
+
+
+# Artifacts folder as seen from the report directory, an absolute file URL when no relative path exists
+# between them, ex: another drive on Windows
+def get_links_prefix(artifacts_path, report_directory):
+    try:
+        return pathlib.PurePath(os.path.relpath(artifacts_path, report_directory)).as_posix()
+    except ValueError:
+        return pathlib.Path(os.path.abspath(artifacts_path)).as_uri()
+
+
+# Links are built for the report given with --html, called by the main process and every worker
+def set_report_path(report_path):
+    global _report_directory
+    _report_directory = os.path.dirname(os.path.abspath(os.path.expanduser(os.path.expandvars(report_path))))
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+# Return the artifact writer of the current worker, creating it on first use or after a fork
+def get_artifact_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or _writer.pid != os.getpid():
+            _writer = ArtifactWriter(max_width=utilities.read_int_config("artifacts", "max_width"),
+                                     jpeg_quality=utilities.read_int_config("artifacts", "jpeg_quality"))
+        return _writer
+
+
+def get_existing_artifact_writer():
+    if _writer is not None and _writer.pid == os.getpid():
+        return _writer
+    return None
+
+
+# Remove artifacts of a previous run, called once by the main process before workers start
+def remove_artifacts():
+    shutil.rmtree(ARTIFACTS_PATH, ignore_errors=True)
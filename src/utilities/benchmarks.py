@@ -0,0 +1,176 @@
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from src.utilities import utilities
+
+BASELINE_VERSION = 1
+# Slow paths stop at max_seconds once they have this many samples
+MIN_SAMPLES = 10
+RESULT_COLUMNS = [("Benchmark", "name"), ("Ops/sec", "ops_per_sec"), ("Mean us", "mean_us"), ("P50 us", "p50_us"),
+                  ("P90 us", "p90_us"), ("P99 us", "p99_us"), ("Max us", "max_us"), ("Samples", "samples"),
+                  ("Peak memory KB", "peak_memory_kb")]
+
+
+# Latency of each call, throughput and peak memory allocated while calling a function repeatedly
+def measure(function, iterations=200, warmup=20, memory_iterations=20, max_seconds=2.0):
+    for _ in range(warmup):
+        function()
+    samples = []
+    deadline = time.perf_counter() + max_seconds
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        function()
+        samples.append(time.perf_counter_ns() - started)
+        if len(samples) >= MIN_SAMPLES and time.perf_counter() > deadline:
+            break
+    # tracemalloc slows every allocation down, so memory is measured apart from latency
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        memory_before, _ = tracemalloc.get_traced_memory()
+        for _ in range(memory_iterations):
+            function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+    return summarize_samples(sorted(samples), peak_memory - memory_before)
+
+
+# Samples of work pytest runs around each of a number of tests, ex: setup and teardown of their fixtures. The first
+# warmup tests are left out and the last memory_tests ones are traced for peak memory instead of being timed
+class PhaseRecorder:
+    def __init__(self, tests, warmup, memory_tests):
+        self.tests = tests
+        self.warmup = warmup
+        self.memory_tests = memory_tests
+        self.started_tests = 0
+        self.samples = []
+        self.peak_memory = 0
+
+    # Sample of the next test, the time of each of its phases is added to it
+    def start_test(self):
+        index = self.started_tests
+        self.started_tests += 1
+        kind = "warmup" if index < self.warmup else "memory" if index >= self.tests - self.memory_tests else "timed"
+        return {"kind": kind, "elapsed": 0}
+
+    @contextmanager
+    def phase(self, sample):
+        traced = sample["kind"] == "memory" and not tracemalloc.is_tracing()
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            sample["elapsed"] += time.perf_counter_ns() - started
+            if traced:
+                self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+
+    def end_test(self, sample):
+        if sample["kind"] == "timed":
+            self.samples.append(sample["elapsed"])
+
+    def is_complete(self):
+        return self.started_tests >= self.tests
+
+    def result(self):
+        return summarize_samples(sorted(self.samples), self.peak_memory)
+
+
+# Samples in nanoseconds, reported in microseconds
+def summarize_samples(sorted_samples, peak_memory):
+    total = sum(sorted_samples)
+    return {"samples": len(sorted_samples),
+            "ops_per_sec": round(len(sorted_samples) / (total / 1e9), 1) if total else 0.0,
+            "mean_us": round(total / len(sorted_samples) / 1000, 2) if sorted_samples else 0.0,
+            "p50_us": percentile_us(sorted_samples, 50),
+            "p90_us": percentile_us(sorted_samples, 90),
+            "p99_us": percentile_us(sorted_samples, 99),
+            "max_us": round(sorted_samples[-1] / 1000, 2) if sorted_samples else 0.0,
+            "peak_memory_kb": round(max(peak_memory, 0) / 1024, 1)}
+
+
+# Nearest-rank percentile of sorted samples in microseconds
+def percentile_us(sorted_samples, percent):
+    if not sorted_samples:
+        return 0.0
+    rank = max(0, min(len(sorted_samples) - 1, -(-len(sorted_samples) * percent // 100) - 1))
+    return round(sorted_samples[int(rank)] / 1000, 2)
+
+
+# Median latency and peak memory that grew past their threshold, differences under the noise floors are ignored
+def find_regressions(result, baseline, latency_threshold, memory_threshold, latency_noise_floor_us,
+                     memory_noise_floor_kb):
+    regressions = []
+    for key, unit, threshold, noise_floor in (("p50_us", "us", latency_threshold, latency_noise_floor_us),
+                                              ("peak_memory_kb", "KB", memory_threshold, memory_noise_floor_kb)):
+        if key not in baseline:
+            continue
+        limit = max(baseline[key] * (1 + threshold), baseline[key] + noise_floor)
+        if result[key] > limit:
+            regressions.append(f"{key} {result[key]}{unit} is over {limit:.2f}{unit}, "
+                               f"baseline {baseline[key]}{unit} + {threshold:.0%}")
+    return regressions
+
+
+# Results of previous runs per benchmark name, comparisons only make sense on the machine that saved them
+class BenchmarkBaseline:
+    def __init__(self, baseline_file_path):
+        self.baseline_file_path = baseline_file_path
+        self.benchmarks = self.read()
+
+    def read(self):
+        try:
+            with open(self.baseline_file_path) as baseline_file:
+                baseline = json.load(baseline_file)
+        except (OSError, ValueError):
+            return {}
+        return baseline.get("benchmarks", {}) if baseline.get("version") == BASELINE_VERSION else {}
+
+    def get(self, name):
+        return self.benchmarks.get(name)
+
+    # Merge results of this run into the baseline, benchmarks that did not run keep their previous results
+    def save(self, results):
+        with utilities.file_lock(self.baseline_file_path + ".lock"):
+            self.benchmarks = self.read()
+            self.benchmarks.update(results)
+            temporary_file_path = f"{self.baseline_file_path}.{os.getpid()}.tmp"
+            with open(temporary_file_path, "w") as baseline_file:
+                json.dump({"version": BASELINE_VERSION,
+                           "python": platform.python_version(),
+                           "machine": platform.machine(),
+                           "saved_at": round(time.time()),
+                           "benchmarks": self.benchmarks}, baseline_file, indent=1, sort_keys=True)
+            os.replace(temporary_file_path, self.baseline_file_path)
+
+
+def read_baseline():
+    return BenchmarkBaseline(os.path.join(utilities.RESULTS_PATH, utilities.read_configs("benchmarks",
+                                                                                           "baseline_file")))
+
+
+def export_json(results, json_file_path):
+    with open(json_file_path, "w") as json_file:
+        json.dump({"benchmarks": results}, json_file, indent=2, sort_keys=True)
+
+
+def format_results(results, baseline=None):
+    lines = [f"{'benchmark':<36}{'ops/sec':>12}{'p50 us':>11}{'p90 us':>11}{'p99 us':>11}{'peak KB':>10}"
+             f"{'p50 vs baseline':>17}"]
+    for name, result in sorted(results.items()):
+        baseline_result = baseline.get(name) if baseline is not None else None
+        change = f"{result['p50_us'] / baseline_result['p50_us'] - 1:+.1%}" \
+            if baseline_result and baseline_result["p50_us"] else "-"
+        lines.append(f"{name:<36}{result['ops_per_sec']:>12}{result['p50_us']:>11}{result['p90_us']:>11}"
+                     f"{result['p99_us']:>11}{result['peak_memory_kb']:>10}{change:>17}")
+    return "\n".join(lines)
@@ -0,0 +1,184 @@
+import json
+import os
+import statistics
+import time
+
+from xdist.scheduler import LoadScheduling
+
+from src.utilities import utilities
+
+
+# Durations of previous runs per test node id, smoothed with an exponential moving average
+class DurationStore:
+    def __init__(self, store_file_path, smoothing=0.3, default_duration=1.0):
+        self.store_file_path = store_file_path
+        self.smoothing = smoothing
+        self.default_duration = default_duration
+        self.tests = self.read()
+
+    def read(self):
+        try:
+            with open(self.store_file_path) as store_file:
+                return json.load(store_file).get("tests", {})
+        except (OSError, ValueError):
+            return {}
+
+    # Known tests use their average. Unseen ones, ex: a new parametrization, use the median of the same test
+    # function, then of the same module, then of all tests
+    def estimate(self, nodeid):
+        test = self.tests.get(nodeid)
+        if test is not None:
+            return test["duration"]
+        function_id, module_id = nodeid.split("[")[0], nodeid.split("::")[0]
+        for matches in (lambda known_id: known_id.split("[")[0] == function_id,
+                        lambda known_id: known_id.split("::")[0] == module_id,
+                        lambda known_id: True):
+            durations = [test["duration"] for known_id, test in self.tests.items() if matches(known_id)]
+            if durations:
+                return statistics.median(durations)
+        return self.default_duration
+
+    # Browser config of a test from previous runs, unseen tests take the one of their module
+    def group(self, nodeid):
+        test = self.tests.get(nodeid)
+        if test is not None:
+            return test.get("group")
+        module_id = nodeid.split("::")[0]
+        groups = {test.get("group") for known_id, test in self.tests.items() if known_id.split("::")[0] == module_id}
+        return groups.pop() if len(groups) == 1 else None
+
+    def is_known(self, nodeid):
+        return nodeid in self.tests
+
+    # Merge durations of this run into the store, other runs may update it at the same time
+    def update(self, durations, groups):
+        with utilities.file_lock(self.store_file_path + ".lock"):
+            self.tests = self.read()
+            for nodeid, duration in durations.items():
+                test = self.tests.get(nodeid)
+                if test is not None:
+                    duration = self.smoothing * duration + (1 - self.smoothing) * test["duration"]
+                self.tests[nodeid] = {"duration": round(duration, 4),
+                                      "runs": (test["runs"] if test is not None else 0) + 1,
+                                      "group": groups.get(nodeid),
+                                      "updated_at": round(time.time())}
+            temporary_file_path = f"{self.store_file_path}.{os.getpid()}.tmp"
+            with open(temporary_file_path, "w") as store_file:
+                json.dump({"version": 1, "tests": self.tests}, store_file, indent=1, sort_keys=True)
+            os.replace(temporary_file_path, self.store_file_path)
+
+
+def read_duration_store():
+    return DurationStore(os.path.join(utilities.RESULTS_PATH, utilities.read_configs("durations", "store_file")),
+                         smoothing=utilities.read_float_config("durations", "smoothing"),
+                         default_duration=utilities.read_float_config("durations", "default_duration"))
+
+
+# pytest-xdist scheduler that hands out the longest pending test to whichever worker asks for work first,
+# longest processing time first keeps the slowest tests from piling up at the end of the run.
+# A worker with a warm browser of a config prefers tests of the same config when one is nearly as long
+class DurationScheduling(LoadScheduling):
+    # Tests queued on each worker, a worker holds its last test until it knows the next one
+    QUEUE_SIZE = 2
+
+    def __init__(self, config, log=None, store=None):
+        super().__init__(config, log)
+        self.store = store if store is not None else read_duration_store()
+        self.affinity_tolerance = utilities.read_float_config("durations", "affinity_tolerance")
+        self.estimates = []
+        self.groups = []
+        # Tests of an xdist_group run on one worker, ex: the rows of a multi-window matrix with --dist loadgroup
+        self.xdist_groups = []
+        self.unit_estimates = []
+        self.node2group = {}
+        self.unseen = 0
+
+    def schedule(self):
+        assert self.collection_is_completed
+        if self.collection is None:
+            if not self._check_nodes_have_same_collection():
+                self.log("**Different tests collected, aborting run**")
+                return
+            self.collection = list(self.node2collection.values())[0]
+            self.estimates = [self.store.estimate(nodeid) for nodeid in self.collection]
+            self.groups = [self.store.group(nodeid) for nodeid in self.collection]
+            self.xdist_groups = [get_xdist_group(nodeid) for nodeid in self.collection]
+            group_estimates = {}
+            for index, xdist_group in enumerate(self.xdist_groups):
+                if xdist_group is not None:
+                    group_estimates[xdist_group] = group_estimates.get(xdist_group, 0) + self.estimates[index]
+            self.unit_estimates = [group_estimates.get(xdist_group, estimate)
+                                   for xdist_group, estimate in zip(self.xdist_groups, self.estimates)]
+            self.unseen = sum(not self.store.is_known(nodeid) for nodeid in self.collection)
+            self.pending[:] = range(len(self.collection))
+            self.sort_pending()
+            self.log(f"estimated {sum(self.estimates):.1f}s of tests, {self.unseen} unseen")
+        # Fill the queues one test at a time, the least loaded worker first, so two long tests never share one
+        while self.pending:
+            nodes = [node for node in self.nodes
+                     if not node.shutting_down and len(self.node2pending[node]) < self.QUEUE_SIZE]
+            if not nodes:
+                return
+            self.send_next_test(min(nodes, key=self.queued_duration))
+        for node in self.nodes:
+            self.check_schedule(node)
+
+    def sort_pending(self):
+        self.pending.sort(key=lambda index: self.unit_estimates[index], reverse=True)
+
+    def check_schedule(self, node, duration=0):
+        if node.shutting_down:
+            return
+        while self.pending and len(self.node2pending[node]) < self.QUEUE_SIZE:
+            self.send_next_test(node)
+        # Workers holding their last test only run it once they are shut down
+        if not self.pending:
+            for pending_node in self.nodes:
+                if not pending_node.shutting_down:
+                    pending_node.shutdown()
+
+    # Send the next test with the other pending tests of its xdist_group
+    def send_next_test(self, node):
+        index = self.pending.pop(self.next_test_position(node))
+        indices = [index]
+        if self.xdist_groups[index] is not None:
+            indices += [pending_index for pending_index in self.pending
+                        if self.xdist_groups[pending_index] == self.xdist_groups[index]]
+            self.pending[:] = [pending_index for pending_index in self.pending if pending_index not in indices]
+        self.node2pending[node].extend(indices)
+        if self.groups[index] is not None:
+            self.node2group[node] = self.groups[index]
+        node.send_runtest_some(indices)
+
+    def queued_duration(self, node):
+        return sum(self.estimates[index] for index in self.node2pending[node])
+
+    # Position in pending of the next test for the worker, the longest one or a test of the worker's browser config
+    def next_test_position(self, node):
+        group = self.node2group.get(node)
+        if group is None or self.groups[self.pending[0]] == group:
+            return 0
+        longest = self.unit_estimates[self.pending[0]]
+        for position, index in enumerate(self.pending):
+            if self.unit_estimates[index] < longest * self.affinity_tolerance:
+                break
+            if self.groups[index] == group:
+                return position
+        return 0
+
+    def mark_test_pending(self, item):
+        super().mark_test_pending(item)
+        self.sort_pending()
+
+    def remove_node(self, node):
+        self.node2group.pop(node, None)
+        crash_item = super().remove_node(node)
+        self.sort_pending()
+        return crash_item
+
+
+# Group pytest-xdist appends to node ids of tests marked with xdist_group when running with --dist loadgroup
+def get_xdist_group(nodeid):
+    if nodeid.rfind("@") > nodeid.rfind("]"):
+        return nodeid.rpartition("@")[2]
+    return None
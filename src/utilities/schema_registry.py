@@ -0,0 +1,179 @@
+import glob
+import itertools
+import json
+import os
+import threading
+
+from jsonschema.validators import validator_for
+
+from src.utilities import utilities
+
+SCHEMAS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/schemas"))
+
+# Drafts where "items" given as a list means tuple validation and "integer" excludes floats
+FAST_PATH_DRAFTS = ("http://json-schema.org/draft-04/schema#",
+                    "http://json-schema.org/draft-06/schema#",
+                    "http://json-schema.org/draft-07/schema#")
+# Keywords the fast path generator understands, anything else falls back to jsonschema only
+FAST_PATH_KEYWORDS = {"$schema", "title", "description", "format",
+                      "type", "enum", "properties", "required", "items"}
+# Array schemas whose items can be validated one by one while streaming
+STREAMING_KEYWORDS = {"$schema", "title", "description", "type", "items"}
+TYPE_CHECKS = {"object": "isinstance({v}, dict)",
+               "array": "isinstance({v}, list)",
+               "string": "isinstance({v}, str)",
+               "integer": "(isinstance({v}, int) and not isinstance({v}, bool))",
+               "number": "(isinstance({v}, (int, float)) and not isinstance({v}, bool))",
+               "boolean": "isinstance({v}, bool)",
+               "null": "{v} is None"}
+
+
+# Registry loading and compiling every json schema file once per process
+class SchemaRegistry:
+    def __init__(self, schemas_path=SCHEMAS_PATH, fast_path=True):
+        self.schemas = {}
+        self.validators = {}
+        self.fast_validators = {}
+        self.fast_path = fast_path
+        self.item_validators = {}
+        self.lock = threading.Lock()
+        for schema_file_path in sorted(glob.glob(os.path.join(schemas_path, "*.json"))):
+            name = os.path.splitext(os.path.basename(schema_file_path))[0]
+            with open(schema_file_path) as schema_file:
+                schema = json.load(schema_file)
+            validator_class = validator_for(schema)
+            # Metaschema is checked once here instead of on every validation
+            validator_class.check_schema(schema)
+            self.schemas[name] = schema
+            self.validators[name] = validator_class(schema)
+            self.fast_validators[name] = generate_fast_validator(schema) if fast_path else None
+
+    def get_schema(self, name):
+        return self.schemas[name]
+
+    def get_validator(self, name):
+        return self.validators[name]
+
+    # Return validate_item(item, index) checking one item of an array schema, ex: with "items" given as a list only
+    # the positions it describes are checked, a list of one schema like get_pets_schema checks every item with it
+    def get_item_validator(self, name):
+        with self.lock:
+            if name not in self.item_validators:
+                self.item_validators[name] = self._build_item_validator(name)
+            return self.item_validators[name]
+
+    def _build_item_validator(self, name):
+        schema = self.schemas[name]
+        if set(schema) - STREAMING_KEYWORDS or schema.get("type", "array") != "array":
+            raise ValueError(f"Schema {name} can't be validated item by item")
+        validator_class = type(self.validators[name])
+        items = schema.get("items", {})
+        if isinstance(items, list) and len(items) == 1:
+            items = items[0]
+
+        def compile_item_schema(item_schema):
+            item_schema = {"$schema": schema["$schema"], **item_schema} if "$schema" in schema else item_schema
+            fast_validator = generate_fast_validator(item_schema) if self.fast_path else None
+            return fast_validator, validator_class(item_schema)
+
+        item_validators = [compile_item_schema(item_schema) for item_schema in items] \
+            if isinstance(items, list) else None
+        every_item_validator = compile_item_schema(items) if isinstance(items, dict) else None
+
+        def validate_item(item, index):
+            if every_item_validator is not None:
+                fast_validator, validator = every_item_validator
+            elif index < len(item_validators):
+                fast_validator, validator = item_validators[index]
+            else:
+                return
+            if fast_validator is not None and fast_validator(item):
+                return
+            validator.validate(item)
+        return validate_item
+
+    def validate(self, instance, name):
+        # Generated function only answers "valid" quickly, jsonschema still builds the error details
+        fast_validator = self.fast_validators[name]
+        if fast_validator is not None and fast_validator(instance):
+            return
+        self.validators[name].validate(instance)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_schema_registry():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            fast_path = utilities.read_bool_config("schemas", "fast_path")
+            _registry = SchemaRegistry(fast_path=fast_path)
+        return _registry
+
+
+# Generate a plain python function returning True when instance is valid, None if schema is not supported
+def generate_fast_validator(schema):
+    if not isinstance(schema, dict) or schema.get("$schema") not in FAST_PATH_DRAFTS:
+        return None
+    lines = ["def fast_validate(v0):"]
+    if not _generate_checks(schema, "v0", 1, lines, itertools.count(1)):
+        return None
+    lines.append("    return True")
+    namespace = {}
+    exec(compile("\n".join(lines), "<schema fast path>", "exec"), namespace)
+    return namespace["fast_validate"]
+
+
+def _generate_checks(schema, var, indent, lines, counter):
+    pad = "    " * indent
+    if not isinstance(schema, dict) or set(schema) - FAST_PATH_KEYWORDS:
+        return False
+
+    if "type" in schema:
+        types = [schema["type"]] if isinstance(schema["type"], str) else schema["type"]
+        if not all(schema_type in TYPE_CHECKS for schema_type in types):
+            return False
+        checks = " or ".join(TYPE_CHECKS[schema_type].format(v=var) for schema_type in types)
+        lines.append(f"{pad}if not ({checks}):")
+        lines.append(f"{pad}    return False")
+
+    if "enum" in schema:
+        # Only string enums, python equality treats True == 1 unlike json schema
+        if not all(isinstance(value, str) for value in schema["enum"]):
+            return False
+        lines.append(f"{pad}if not (isinstance({var}, str) and {var} in {tuple(schema['enum'])!r}):")
+        lines.append(f"{pad}    return False")
+
+    if "required" in schema or "properties" in schema:
+        lines.append(f"{pad}if isinstance({var}, dict):")
+        for key in schema.get("required", []):
+            lines.append(f"{pad}    if {key!r} not in {var}:")
+            lines.append(f"{pad}        return False")
+        for key, property_schema in schema.get("properties", {}).items():
+            child = f"v{next(counter)}"
+            lines.append(f"{pad}    if {key!r} in {var}:")
+            lines.append(f"{pad}        {child} = {var}[{key!r}]")
+            if not _generate_checks(property_schema, child, indent + 2, lines, counter):
+                return False
+        lines.append(f"{pad}    pass")
+
+    if "items" in schema:
+        items = schema["items"]
+        child = f"v{next(counter)}"
+        lines.append(f"{pad}if isinstance({var}, list):")
+        if isinstance(items, dict):
+            lines.append(f"{pad}    for {child} in {var}:")
+            if not _generate_checks(items, child, indent + 2, lines, counter):
+                return False
+            lines.append(f"{pad}        pass")
+        else:
+            # Tuple validation only checks the positions it describes
+            for index, item_schema in enumerate(items):
+                lines.append(f"{pad}    if len({var}) > {index}:")
+                lines.append(f"{pad}        {child} = {var}[{index}]")
+                if not _generate_checks(item_schema, child, indent + 2, lines, counter):
+                    return False
+        lines.append(f"{pad}    pass")
+    return True
@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+from collections.abc import Mapping
+from configparser import ConfigParser
+from dataclasses import dataclass
+from types import MappingProxyType
+
+CONFIG_FILE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../configs/config.ini"))
+DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data"))
+PROFILE_ENV_VARIABLE = "TEST_PROFILE"
+DEFAULT_PROFILE = "local"
+
+
+# Read-only config section with typed getters
+class Section(Mapping):
+    def __init__(self, name, values):
+        self.name = name
+        self._values = MappingProxyType(dict(values))
+
+    def __getitem__(self, option):
+        return self._values[option]
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def get_str(self, option):
+        return self[option]
+
+    def get_int(self, option):
+        return int(self[option])
+
+    def get_float(self, option):
+        return float(self[option])
+
+    def get_bool(self, option):
+        return self[option].strip().casefold() in ("1", "true", "yes", "on")
+
+    def get_list(self, option, cast=str):
+        return [cast(value.strip()) for value in self[option].split(",") if value.strip()]
+
+
+@dataclass(frozen=True)
+class WebSettings:
+    web_base_url: str
+
+
+@dataclass(frozen=True)
+class APISettings:
+    api_base_url: str
+    api_key: str
+
+
+@dataclass(frozen=True)
+class Settings:
+    profile: str
+    sections: Mapping
+    web: WebSettings
+    api: APISettings
+
+    def section(self, name):
+        return self.sections[name]
+
+
+# Settings loaded once per process and reloaded only when config.ini changes on disk
+class SettingsStore:
+    def __init__(self, config_file_path=CONFIG_FILE_PATH):
+        self.config_file_path = config_file_path
+        self.lock = threading.Lock()
+        self.profile = None
+        self.overrides = {}
+        self._settings = None
+        self._config_file_mtime = None
+
+    def get(self):
+        config_file_mtime = os.stat(self.config_file_path).st_mtime_ns
+        with self.lock:
+            if self._settings is None or config_file_mtime != self._config_file_mtime:
+                self._settings = self._load()
+                self._config_file_mtime = config_file_mtime
+            return self._settings
+
+    def select_profile(self, profile):
+        with self.lock:
+            self.profile = profile
+            self._settings = None
+
+    # Runtime override of one option, ex: a fixture pointing the API at a local server
+    def override(self, section, option, value):
+        with self.lock:
+            self.overrides.setdefault(section, {})[option] = value
+            self._settings = None
+
+    def clear_override(self, section, option):
+        with self.lock:
+            self.overrides.get(section, {}).pop(option, None)
+            self._settings = None
+
+    # Base section, then [section:profile], then SECTION__OPTION env variables, then runtime overrides
+    def _load(self):
+        config = ConfigParser()
+        config.read(self.config_file_path)
+        profile = self.profile or os.getenv(PROFILE_ENV_VARIABLE, DEFAULT_PROFILE)
+        section_names = {section_name.split(":")[0] for section_name in config.sections()}
+        sections = {}
+        for section_name in sorted(section_names):
+            values = {}
+            for profile_section_name in (section_name, f"{section_name}:{profile}"):
+                if config.has_section(profile_section_name):
+                    values.update(config.items(profile_section_name))
+            for option in values:
+                env_value = os.getenv(f"{section_name}__{option}".upper())
+                if env_value is not None:
+                    values[option] = env_value
+            values.update(self.overrides.get(section_name, {}))
+            sections[section_name] = Section(section_name, values)
+        return Settings(profile=profile,
+                        sections=MappingProxyType(sections),
+                        web=WebSettings(web_base_url=sections["web"]["web_base_url"]),
+                        api=APISettings(api_base_url=sections["api"]["api_base_url"],
+                                        api_key=os.getenv("api_key")))
+
+
+# Json files under src/data loaded on first use and reloaded only when they change on disk
+class DataStore:
+    def __init__(self, data_path=DATA_PATH):
+        self.data_path = data_path
+        self.lock = threading.Lock()
+        self._data = {}
+
+    def get(self, relative_path):
+        data_file_path = os.path.join(self.data_path, relative_path)
+        data_file_mtime = os.stat(data_file_path).st_mtime_ns
+        with self.lock:
+            cached = self._data.get(data_file_path)
+            if cached is None or cached[0] != data_file_mtime:
+                with open(data_file_path) as data_file:
+                    cached = (data_file_mtime, freeze(json.load(data_file)))
+                self._data[data_file_path] = cached
+            return cached[1]
+
+
+# Convert parsed json into read-only containers so cached data can be shared safely
+def freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+settings_store = SettingsStore()
+data_store = DataStore()
+
+
+def get_settings():
+    return settings_store.get()
+
+
+def read_data_file(relative_path):
+    return data_store.get(relative_path)
@@ -0,0 +1,116 @@
+import codecs
+import itertools
+import json
+import math
+import random
+import re
+import time
+
+from src.utilities import api_metrics
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# Rest of the buffer could still belong to a number cut by the chunk boundary, ex: "0." or "1e"
+NUMBER_TAIL = re.compile(r"[0-9.eE+\-]*\Z")
+
+
+# Yield the items of a top level json array from a streamed response one by one, memory is bounded by one item
+# and one chunk. Time spent waiting for chunks is added to the download phase of the call, decoding to json parse
+def iter_json_array(response, chunk_size=65536):
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")()
+    chunks = response.iter_content(chunk_size=chunk_size)
+    buffer, position = "", 0
+    started = finished = stream_ended = False
+    expect_item = True
+    item_count = 0
+    try:
+        while not finished:
+            chunk_start = time.perf_counter()
+            chunk = next(chunks, None)
+            api_metrics.add_phase_time("download", time.perf_counter() - chunk_start)
+            if chunk is None:
+                stream_ended = True
+                text = text_decoder.decode(b"", final=True)
+            else:
+                api_metrics.add_response_bytes(len(chunk))
+                text = text_decoder.decode(chunk)
+            buffer = buffer[position:] + text
+            position = 0
+
+            parse_start = time.perf_counter()
+            items = []
+            while True:
+                position = WHITESPACE.match(buffer, position).end()
+                if position == len(buffer):
+                    break
+                if not started:
+                    if buffer[position] != "[":
+                        raise json.JSONDecodeError("Expecting '['", buffer, position)
+                    started = True
+                    position += 1
+                    continue
+                if buffer[position] == "]":
+                    if expect_item and item_count:
+                        raise json.JSONDecodeError("Expecting value", buffer, position)
+                    finished = True
+                    break
+                if not expect_item:
+                    if buffer[position] != ",":
+                        raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+                    expect_item = True
+                    position += 1
+                    continue
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if stream_ended:
+                        raise
+                    # Item is not complete yet, wait for the next chunk
+                    break
+                # Numbers ending at the chunk boundary may continue in the next chunk
+                if isinstance(item, (int, float)) and not stream_ended and NUMBER_TAIL.match(buffer, end):
+                    break
+                items.append(item)
+                item_count += 1
+                position = end
+                expect_item = False
+            api_metrics.add_phase_time("json_parse", time.perf_counter() - parse_start)
+            yield from items
+
+            if stream_ended and not finished:
+                raise json.JSONDecodeError("Unterminated array", buffer, len(buffer))
+    finally:
+        # Closing also releases the connection when the caller stops early
+        response.close()
+
+
+# Pick k random items in one pass keeping only k of them in memory, reservoir sampling with Algorithm L.
+# The random module is used by default so samples follow the seed of the test
+def reservoir_sample(items, k, rng=random):
+    if k <= 0:
+        return []
+    items = iter(items)
+    reservoir = list(itertools.islice(items, k))
+    if len(reservoir) < k:
+        rng.shuffle(reservoir)
+        return reservoir
+    # Skip lengths follow the distribution of the next replaced position instead of drawing for every item
+    weight = math.exp(math.log(_random_positive(rng)) / k)
+    while True:
+        skip = math.floor(math.log(_random_positive(rng)) / math.log(1 - weight))
+        item = next(itertools.islice(items, skip, None), _END)
+        if item is _END:
+            return reservoir
+        reservoir[rng.randrange(k)] = item
+        weight *= math.exp(math.log(_random_positive(rng)) / k)
+
+
+# Uniform value in (0, 1), log of zero is undefined
+def _random_positive(rng):
+    value = rng.random()
+    while value == 0.0:
+        value = rng.random()
+    return value
+
+
+_END = object()
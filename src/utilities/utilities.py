@@ -1,68 +1,182 @@
+import atexit
+import glob
+import heapq
 import json
 import logging
+import logging.handlers
 import os
-from configparser import ConfigParser
+import queue
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
+from src.utilities import settings
 
-def custom_logger():
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.INFO)
-    parent_path = Path(os.path.dirname(os.path.abspath(__file__))).parent
-    log_file_path = os.path.join(parent_path, "results/automation_logs.log")
-    file_handler = logging.FileHandler(log_file_path, mode="w")
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s',
-                                  datefmt='%Y-%m-%d %H:%M:%S')
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    return logger
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 
-def read_env_variables(key):
-    return os.getenv(key)
+RESULTS_PATH = os.path.join(Path(os.path.dirname(os.path.abspath(__file__))).parent, "results")
+LOG_FILE_NAME = "automation_logs"
+LOG_FORMAT = "%(asctime)s.%(msecs)03d - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+_log_listener = None
 
-def read_configs(section, option):
-    config = ConfigParser()
-    configs_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../configs"))
-    config_file_path = configs_path + "/config.ini"
-    config.read(config_file_path)
-    return config.get(section, option)
 
+# Logger writing through a queue so callers never block on disk, one file per pytest-xdist worker
+def custom_logger():
+    global _log_listener
+    logger = logging.getLogger(__name__)
+    if _log_listener is None:
+        logger.setLevel(logging.INFO)
+        log_queue = queue.SimpleQueue()
+        file_handler = logging.FileHandler(get_worker_log_file_path(), mode="w")
+        if read_bool_config("logging", "json_lines"):
+            file_handler.setFormatter(JsonLinesFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT))
+        _log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _log_listener.start()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        atexit.register(stop_logger)
+    return logger
 
-def read_web_login_test_data():
-    data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/test_data"))
-    web_login_file_path = data_path + "/web_login_data.json"
-    data = json.load(open(web_login_file_path))
-    return data
 
+# Flush queued records to the worker log file and stop the listener thread
+def stop_logger():
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        for handler in _log_listener.handlers:
+            handler.close()
+        logger = logging.getLogger(__name__)
+        for handler in [handler for handler in logger.handlers
+                        if isinstance(handler, logging.handlers.QueueHandler)]:
+            logger.removeHandler(handler)
+        _log_listener = None
+
+
+def get_worker_id():
+    return os.getenv("PYTEST_XDIST_WORKER", "main")
+
+
+def get_worker_log_file_path(worker_id=None):
+    return os.path.join(RESULTS_PATH, f"{LOG_FILE_NAME}_{worker_id or get_worker_id()}.log")
+
+
+# Remove worker log files left by a previous run with more workers
+def remove_worker_log_files():
+    for log_file_path in glob.glob(get_worker_log_file_path("gw*")):
+        os.remove(log_file_path)
+
+
+# Merge all worker log files into one log ordered by timestamp and remove them
+def merge_worker_log_files():
+    worker_log_file_paths = sorted(glob.glob(get_worker_log_file_path("*")))
+    worker_log_files = [open(log_file_path) for log_file_path in worker_log_file_paths]
+    try:
+        merged_log_file_path = os.path.join(RESULTS_PATH, f"{LOG_FILE_NAME}.log")
+        with open(merged_log_file_path, "w") as merged_log_file:
+            for _, entry in heapq.merge(*[read_log_entries(log_file) for log_file in worker_log_files]):
+                merged_log_file.write(entry)
+    finally:
+        for log_file in worker_log_files:
+            log_file.close()
+    for log_file_path in worker_log_file_paths:
+        os.remove(log_file_path)
+
+
+# Yield (timestamp, entry) from a log file, lines without a timestamp belong to the previous entry
+def read_log_entries(log_file):
+    timestamp, entry = None, ""
+    for line in log_file:
+        line_timestamp = read_log_line_timestamp(line)
+        if line_timestamp is not None:
+            if entry:
+                yield timestamp or "", entry
+            timestamp, entry = line_timestamp, line
+        else:
+            entry += line
+    if entry:
+        yield timestamp or "", entry
+
+
+def read_log_line_timestamp(line):
+    if line.startswith("{"):
+        try:
+            return json.loads(line)["time"]
+        except (ValueError, KeyError):
+            return None
+    timestamp = line[:23]
+    if len(timestamp) == 23 and timestamp[4] == "-" and timestamp[10] == " " and timestamp[19] == ".":
+        return timestamp
+    return None
+
+
+# Structured log records, one json object per line
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        log_record = {"time": f"{self.formatTime(record, LOG_DATE_FORMAT)}.{int(record.msecs):03d}",
+                      "level": record.levelname,
+                      "worker": get_worker_id(),
+                      "message": record.getMessage()}
+        if record.exc_info:
+            log_record["exception"] = self.formatException(record.exc_info)
+        return json.dumps(log_record)
 
-def read_get_pet_schema():
-    return read_schema_json_file("get_pet_schema")
 
+def read_env_variables(key):
+    return os.getenv(key)
 
-def read_get_pets_schema():
-    return read_schema_json_file("get_pets_schema")
+
+def read_configs(section, option):
+    return settings.get_settings().section(section).get_str(option)
 
 
-def read_post_pet_schema():
-    return read_schema_json_file("post_pet_schema")
+def read_int_config(section, option):
+    return settings.get_settings().section(section).get_int(option)
 
 
-def read_error_message_schema():
-    return read_schema_json_file("error_response_schema")
+def read_float_config(section, option):
+    return settings.get_settings().section(section).get_float(option)
 
 
-def read_get_order_schema():
-    return read_schema_json_file("get_order_schema")
+def read_bool_config(section, option):
+    return settings.get_settings().section(section).get_bool(option)
 
 
-def read_get_inventory_schema():
-    return read_schema_json_file("get_inventory_schema")
+def read_list_config(section, option, cast=str):
+    return settings.get_settings().section(section).get_list(option, cast)
 
 
-def read_schema_json_file(file):
-    data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../data/schemas"))
-    web_login_file_path = data_path + "/" + file + ".json"
-    data = json.load(open(web_login_file_path))
-    return data
+def read_web_login_test_data():
+    return settings.read_data_file("test_data/web_login_data.json")
+
+
+# Exclusive lock on a file shared by all processes of the run, ex: pytest-xdist workers
+@contextmanager
+def file_lock(lock_file_path, poll_interval=0.05):
+    os.makedirs(os.path.dirname(lock_file_path), exist_ok=True)
+    with open(lock_file_path, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
@@ -1,22 +1,24 @@
-import os
-import os.path
+import sys
+import time
 
-import pytest
-from selenium import webdriver
-from selenium.webdriver import ChromeOptions, FirefoxOptions, EdgeOptions
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+# Import time of the framework plugins is measured from here, see pytest_configure
+IMPORT_STARTED = time.perf_counter()
 
-from src.utilities import utilities
+import pytest  # noqa: E402
 
-logger = utilities.custom_logger()
+from src.utilities import durations, settings, utilities  # noqa: E402
+
+# Fixtures, options and hooks of API tests and web tests, the web plugin loads selenium only when a test needs a driver
+pytest_plugins = ["tests.plugins.api_plugin", "tests.plugins.web_plugin", "tests.plugins.benchmark_plugin"]
+# Duration of each test summed over its phases and the browser config it ran with, saved for the next runs
+test_durations = {}
+test_browser_configs = {}
 
 
 # Fixture to log start and finish of each test case
 @pytest.fixture(autouse=True)
 def setup_and_teardown(request):
+    logger = utilities.custom_logger()
     test_case_name = request.node.name
     logger.info(f"Starting test case: {test_case_name} ...")
     yield
@@ -24,69 +26,89 @@ def setup_and_teardown(request):
     logger.info(f"Test case: {test_case_name} finished.")
 
 
-# Adding cmd options to control running web test cases
+# Adding cmd options shared by api and web test cases
 def pytest_addoption(parser):
     parser.addoption(
-        "--browser", action="store", default="chrome",
-        help="Select browser to run web tests. ex: --browser edge",
-        choices=("chrome", "firefox", "edge")
+        "--profile", action="store", default=None,
+        help="Select config profile, [section:profile] in config.ini overrides [section]. ex: --profile staging"
     )
     parser.addoption(
-        "--headless", action="store_true", default="",
-        help="Select headless mode for web tests. ex: --headless"
+        "--duration-scheduling", action="store_true", default=False,
+        help="Send the longest tests first to pytest-xdist workers based on durations of previous runs. "
+             "ex: -n auto --duration-scheduling"
     )
 
 
-# Fixture to set up and teardown webdriver for each web test case
-@pytest.fixture(scope="function")
-def driver(request):
-    global driver
-    browser = request.config.getoption("--browser")
-    headless = request.config.getoption("--headless")
-
-    if browser.casefold() == "chrome":
-        options = ChromeOptions()
-        if headless: options.add_argument("--headless")
-        driver = webdriver.Chrome(options=options, service=Service(ChromeDriverManager().install()))
-
-    elif browser.casefold() == "firefox":
-        options = FirefoxOptions()
-        if headless: options.add_argument("--headless")
-        driver = webdriver.Firefox(options=options, service=Service(GeckoDriverManager().install()))
-
-    elif browser.casefold() == "edge":
-        options = EdgeOptions()
-        if headless: options.add_argument("--headless")
-        driver = webdriver.Edge(options=options, service=Service(EdgeChromiumDriverManager().install()))
-    else:
-        raise Exception("Browser name is not correct.")
-
-    driver.maximize_window()
-    driver.implicitly_wait(3)
-    web_base_url = utilities.read_configs("web", "web_base_url")
-    driver.get(web_base_url)
-    yield driver
-    driver.quit()
-
-
-# Fixture to capture and add screenshot to report on web test cases failure
-@pytest.hookimpl(hookwrapper=True)
-def pytest_runtest_makereport(item, call):
-    pytest_html = item.config.pluginmanager.getplugin('html')
-    outcome = yield
-    report = outcome.get_result()
-    extra = getattr(report, 'extra', [])
-    if report.when == 'call':
-        xfail = hasattr(report, 'wasxfail')
-        if (report.skipped and xfail) or (report.failed and not xfail):
-            report_directory = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src/results/"))
-            file_name = report.nodeid.replace("::", "_")
-            if "web" in file_name:
-                file_name = file_name.split(".")[1] + ".png"
-                destination_file = os.path.join(report_directory, file_name)
-                driver.save_screenshot(destination_file)
-                extra.append(pytest_html.extras.image(file_name))
-        report.extra = extra
+# Collect durations of each finished test phase, on the main process when running with pytest-xdist. Rows run in
+# browser tabs count their own time, the call of the first row runs the whole matrix
+def pytest_runtest_logreport(report):
+    duration = report.duration
+    for name, value in report.user_properties:
+        if name == "browser_config":
+            test_browser_configs[report.nodeid] = value
+        elif name == "window_row_elapsed":
+            duration = value
+    if not report.skipped:
+        test_durations[report.nodeid] = test_durations.get(report.nodeid, 0) + duration
+
+
+# Use the duration aware scheduler of pytest-xdist when asked for
+@pytest.hookimpl(optionalhook=True)
+def pytest_xdist_make_scheduler(config, log):
+    if config.getoption("--duration-scheduling"):
+        config.duration_scheduler = durations.DurationScheduling(config, log)
+        return config.duration_scheduler
+
+
+# Select config profile, check the import time budget and remove worker log files of a previous run before the
+# workers start. Runs before the plugins configure so they read settings of the selected profile
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    config.import_ms = (time.perf_counter() - IMPORT_STARTED) * 1000
+    profile = config.getoption("--profile")
+    if profile:
+        settings.settings_store.select_profile(profile)
+    import_budget_ms = utilities.read_float_config("startup", "import_budget_ms")
+    if config.import_ms > import_budget_ms:
+        config.issue_config_time_warning(pytest.PytestConfigWarning(
+            f"Test framework plugins took {config.import_ms:.0f} ms to import, over the budget of "
+            f"{import_budget_ms:.0f} ms in the [startup] section of config.ini"), stacklevel=2)
+    if not hasattr(config, "workerinput"):
+        utilities.remove_worker_log_files()
+
+
+def pytest_report_header(config):
+    return f"test framework plugins imported in {config.import_ms:.0f} ms"
+
+
+# Log whether the browser stack was loaded, runs without web tests should never load it
+def pytest_collection_finish(session):
+    utilities.custom_logger().info(f"Collected {len(session.items)} tests, framework plugins imported in "
+                                   f"{session.config.import_ms:.0f} ms, selenium loaded: {'selenium' in sys.modules}")
+
+
+# Workers flush their own log file after the plugins logged their stats, the main process merges all of them once
+# workers are done and saves test durations
+@pytest.hookimpl(trylast=True)
+def pytest_sessionfinish(session):
+    utilities.stop_logger()
+    if not hasattr(session.config, "workerinput"):
+        utilities.merge_worker_log_files()
+        if test_durations:
+            durations.read_duration_store().update(test_durations, test_browser_configs)
+
+
+# Summarize how the duration aware scheduler spread the tests
+def pytest_terminal_summary(terminalreporter, config):
+    duration_scheduler = getattr(config, "duration_scheduler", None)
+    if duration_scheduler is not None and duration_scheduler.collection:
+        workers = len(duration_scheduler.node2collection)
+        total_duration = sum(test_durations.values())
+        terminalreporter.write_sep("-", "duration scheduling")
+        terminalreporter.write_line(f"{total_duration:.1f}s of tests on {workers} workers, "
+                                    f"ideal wall time: {total_duration / workers:.1f}s, "
+                                    f"estimated: {sum(duration_scheduler.estimates):.1f}s, "
+                                    f"unseen tests: {duration_scheduler.unseen}")
 
 
 # Set report title
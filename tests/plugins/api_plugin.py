@@ -0,0 +1,292 @@
+import os.path
+import random
+
+import pytest
+
+from src.helpers import Cassette, DataFactory, HTTPTransport, ResourceRegistry, ResponseCache
+from src.helpers.PetstoreStub import PetstoreStubServer
+from src.utilities import api_metrics, settings, utilities
+
+# API calls of every test collected on the main process, from workers through report user properties
+api_metrics_session = api_metrics.APIMetricsSession()
+# Outcome of deleting the resources created by tests, collected on the main process
+resource_cleanup_totals = {"deleted": 0, "already_gone": 0, "leaked": []}
+# Response cache hits and misses of all tests, collected on the main process
+response_cache_totals = {"hits": 0, "misses": 0, "bypasses": 0}
+# Exchanges recorded, replayed or verified through cassettes and the drifts found, collected on the main process
+cassette_totals = {"tests": 0, "requests": 0, "drifts": []}
+
+
+# Adding cmd options to control running api test cases
+def pytest_addoption(parser):
+    parser.addoption(
+        "--petstore", action="store", default="remote", choices=("remote", "local"),
+        help="Run API tests against api_base_url or an in-process Petstore stub. ex: --petstore local"
+    )
+    parser.addoption(
+        "--data-seed", action="store", type=int, default=None,
+        help="Seed of generated test data, a failing run is replayed with the seed shown in its header. "
+             "ex: --data-seed 1234"
+    )
+    parser.addoption(
+        "--cassette", action="store", default=None, choices=Cassette.MODES,
+        help="Record API exchanges of each test to src/data/cassettes, replay them without network or verify "
+             "them against the live API. ex: --cassette replay"
+    )
+
+
+# Fixture to build the test data pools of each worker once, from the seed shared by all workers
+@pytest.fixture(scope="session", autouse=True)
+def test_data_pools(request):
+    return DataFactory.start_session(request.config.data_seed)
+
+
+# Fixture to seed the test data factory and the random module from the test node id, dates are seeded as well
+# when API exchanges go through cassettes so recorded request bodies match on every run
+@pytest.fixture(autouse=True)
+def test_data_factory(request, test_data_pools):
+    factory = DataFactory.start_test(request.node.nodeid, frozen_clock=Cassette.get_mode() != "off")
+    random.seed(factory.test_seed)
+    return factory
+
+
+# Fixture to start an in-process Petstore stub for each worker and point API helpers at it
+@pytest.fixture(scope="session", autouse=True)
+def petstore_stub(request):
+    if request.config.getoption("--petstore") != "local":
+        yield None
+        return
+    stub_settings = settings.get_settings().section("petstore_stub")
+    server = PetstoreStubServer(latency_ms=stub_settings.get_float("latency_ms"),
+                                latency_jitter_ms=stub_settings.get_float("latency_jitter_ms"),
+                                error_rate=stub_settings.get_float("error_rate"),
+                                error_status=stub_settings.get_int("error_status"),
+                                seed=stub_settings.get_int("seed"),
+                                initial_pets=stub_settings.get_int("initial_pets")).start()
+    settings.settings_store.override("api", "api_base_url", server.base_url)
+    yield server
+    utilities.custom_logger().info(f"Petstore stub stats: {server.stats()}")
+    settings.settings_store.clear_override("api", "api_base_url")
+    server.stop()
+
+
+# Fixture for tests that change the in-process Petstore stub directly, ex: to serve invalid data
+@pytest.fixture(scope="function")
+def local_petstore(petstore_stub):
+    if petstore_stub is None or Cassette.get_mode() != "off":
+        pytest.skip("Runs against the Petstore stub with --petstore local and cassettes off")
+    return petstore_stub
+
+
+# Fixture to delete resources left in the session registry, also retries the ones test teardowns could not delete.
+# It is torn down with the last test of the worker, whose teardown report carries the outcome to the main process
+@pytest.fixture(scope="session")
+def session_resources(request, petstore_stub):
+    registry = ResourceRegistry.get_session_registry()
+    yield registry
+    # Replayed resources were never created on a backend
+    pending = registry.pending()
+    if pending and Cassette.get_mode() != "replay":
+        logger = utilities.custom_logger()
+        result = registry.cleanup(delete_resource, utilities.read_int_config("resources", "batch_size"))
+        request.session.session_resource_cleanup = {
+            **result, "retried": [(resource["kind"], resource["id"]) for resource in pending]}
+        logger.info(f"Session resources cleanup: deleted {result['deleted']}, "
+                    f"already gone {result['already_gone']}, orphaned {len(result['leaked'])}")
+        for resource in result["leaked"]:
+            logger.warning(f"Orphaned resource left on the backend: {resource}")
+
+
+# Fixture to track the pets and orders each test creates and delete them concurrently when it finishes
+@pytest.fixture(autouse=True)
+def test_resources(request, session_resources, cassette):
+    if utilities.read_configs("resources", "scope") != "test":
+        yield session_resources
+        return
+    registry = ResourceRegistry.start_test(request.node.nodeid)
+    yield registry
+    ResourceRegistry.end_test()
+    if registry.pending():
+        result = registry.cleanup(delete_resource, utilities.read_int_config("resources", "batch_size"))
+        # Deletions that failed are retried once more at the end of the session
+        session_resources.adopt(result["leaked"])
+        request.node.resource_cleanup = result
+        for resource in result["leaked"]:
+            utilities.custom_logger().warning(f"Test case: {request.node.name} could not delete {resource}")
+
+
+# Fixture to send the API requests of each test through its cassette, cleanup requests of test_resources included
+@pytest.fixture(autouse=True)
+def cassette(request):
+    if Cassette.get_mode() == "off":
+        yield None
+        return
+    cassette = Cassette.start_test(request.node.nodeid, request.config.data_seed)
+    yield cassette
+    Cassette.end_test()
+    summary = cassette.summary()
+    # Tests without API requests, ex: web tests, are left out of the run summary
+    if summary["requests"] or summary["drifts"]:
+        request.node.cassette_summary = summary
+    for drift in summary["drifts"]:
+        utilities.custom_logger().warning(f"Test case: {request.node.name} cassette drift on {drift['exchange']}: "
+                                          f"{'; '.join(drift['drifts'])}")
+
+
+# Tests that never create resources don't import APIHelper and its schema and payload dependencies
+def delete_resource(kind, resource_id):
+    from src.helpers.APIHelper import APIHelper
+    return APIHelper().delete_resource(kind, resource_id)
+
+
+# Fixture to share cached GET responses within a test, a module or the whole session of each worker
+@pytest.fixture(autouse=True)
+def response_cache(request):
+    scope = utilities.read_configs("cache", "scope")
+    scope_key = {"test": request.node.nodeid, "module": request.module.__name__}.get(scope, "session")
+    cache = ResponseCache.activate(scope_key)
+    if cache is None:
+        yield None
+        return
+    stats_before = cache.stats()
+    yield cache
+    stats_after = cache.stats()
+    request.node.response_cache_stats = {key: stats_after[key] - stats_before[key] for key in response_cache_totals}
+
+
+# Hook to add API call metrics, resources deleted and response cache counters of each test to the report
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    pytest_html = item.config.pluginmanager.getplugin('html')
+    outcome = yield
+    report = outcome.get_result()
+    extras = getattr(report, 'extras', [])
+    # Attach timings and sizes of the API calls sent by the test, calls of setup fixtures are shown with the call phase
+    api_calls = api_metrics.pop_call_records() if report.when != 'setup' else []
+    if api_calls:
+        report.user_properties.append(("api_calls", api_calls))
+        summary = api_metrics.summarize_test_calls(api_calls)
+        extras.append(pytest_html.extras.html(
+            f"<div>API calls: {summary['calls']} in {report.when}, {summary['total_ms']} ms, "
+            f"{summary['response_bytes']} bytes received</div>"
+            + api_metrics.render_html_table(api_calls, api_metrics.TEST_CALL_COLUMNS)))
+    # Report the resources deleted after the test and its response cache counters
+    resource_cleanup = getattr(item, "resource_cleanup", None)
+    if report.when == 'teardown' and resource_cleanup is not None:
+        report.user_properties.append(("resource_cleanup", resource_cleanup))
+    session_resource_cleanup = getattr(item.session, "session_resource_cleanup", None)
+    if report.when == 'teardown' and session_resource_cleanup is not None:
+        report.user_properties.append(("session_resource_cleanup", session_resource_cleanup))
+        item.session.session_resource_cleanup = None
+    response_cache_stats = getattr(item, "response_cache_stats", None)
+    if report.when == 'teardown' and response_cache_stats is not None:
+        report.user_properties.append(("response_cache", response_cache_stats))
+    cassette_summary = getattr(item, "cassette_summary", None)
+    if report.when == 'teardown' and cassette_summary is not None:
+        report.user_properties.append(("cassette", cassette_summary))
+    report.extras = extras
+
+
+# Collect API call metrics of each finished test phase, on the main process when running with pytest-xdist
+def pytest_runtest_logreport(report):
+    for name, value in report.user_properties:
+        if name == "api_calls":
+            api_metrics_session.add_test_calls(report.nodeid, value)
+        elif name == "response_cache":
+            for key in response_cache_totals:
+                response_cache_totals[key] += value[key]
+        elif name == "cassette":
+            cassette_totals["mode"] = value["mode"]
+            cassette_totals["tests"] += 1
+            cassette_totals["requests"] += value["requests"]
+            cassette_totals["drifts"].extend({"nodeid": report.nodeid, **drift} for drift in value["drifts"])
+        elif name == "resource_cleanup":
+            resource_cleanup_totals["deleted"] += value["deleted"]
+            resource_cleanup_totals["already_gone"] += value["already_gone"]
+            resource_cleanup_totals["leaked"].extend(value["leaked"])
+        elif name == "session_resource_cleanup":
+            add_session_resource_cleanup(value)
+
+
+# Resources retried at the end of a worker's session are no longer leaked, unless the retry failed again
+def add_session_resource_cleanup(session_cleanup):
+    retried = {tuple(resource) for resource in session_cleanup["retried"]}
+    resource_cleanup_totals["deleted"] += session_cleanup["deleted"]
+    resource_cleanup_totals["already_gone"] += session_cleanup["already_gone"]
+    resource_cleanup_totals["leaked"] = [resource for resource in resource_cleanup_totals["leaked"]
+                                         if (resource["kind"], resource["id"]) not in retried]
+    resource_cleanup_totals["leaked"].extend(session_cleanup["leaked"])
+
+
+# Select the cassette mode. Workers get the test data seed of the main process so their pools are identical,
+# cassettes are replayed with the seed they were recorded with
+def pytest_configure(config):
+    cassette_mode = config.getoption("--cassette")
+    if cassette_mode:
+        settings.settings_store.override("cassettes", "mode", cassette_mode)
+    if hasattr(config, "workerinput"):
+        config.data_seed = config.workerinput["data_seed"]
+        return
+    config.data_seed = config.getoption("--data-seed")
+    if config.data_seed is None and Cassette.get_mode() != "off":
+        config.data_seed = Cassette.read_recorded_seed()
+    if config.data_seed is None:
+        config.data_seed = DataFactory.read_session_seed()
+    if Cassette.get_mode() == "record":
+        Cassette.write_recorded_seed(config.data_seed)
+
+
+# Pass the test data seed to each pytest-xdist worker
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node):
+    node.workerinput["data_seed"] = node.config.data_seed
+
+
+def pytest_report_header(config):
+    return f"test data seed: {config.data_seed} (replay with --data-seed {config.data_seed})"
+
+
+# Log connection reuse stats of this worker's HTTP transport and close its pool, export API call metrics
+def pytest_sessionfinish(session):
+    transport = HTTPTransport.get_existing_transport()
+    if transport is not None:
+        utilities.custom_logger().info(f"HTTP transport stats: {transport.stats()}")
+        transport.close()
+    if not hasattr(session.config, "workerinput") and api_metrics_session.tests:
+        api_metrics_session.export_json(os.path.join(utilities.RESULTS_PATH, "api_metrics.json"))
+
+
+# Add slowest API endpoints table and response cache counters to the report summary
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    endpoint_stats = api_metrics_session.get_endpoint_stats()
+    if endpoint_stats:
+        postfix.append("<h2>Slowest API endpoints</h2>"
+                       + api_metrics.render_html_table(endpoint_stats[:10], api_metrics.ENDPOINT_COLUMNS))
+    if any(response_cache_totals.values()):
+        postfix.append(f"<p>API response cache: {response_cache_totals['hits']} hits, "
+                       f"{response_cache_totals['misses']} misses, {response_cache_totals['bypasses']} bypassed</p>")
+
+
+# Summarize cassettes, response cache counters, resources deleted after tests and the ones left on the backend
+def pytest_terminal_summary(terminalreporter):
+    if cassette_totals["tests"]:
+        terminalreporter.write_sep("-", f"cassettes ({cassette_totals['mode']})")
+        terminalreporter.write_line(f"tests: {cassette_totals['tests']}, requests: {cassette_totals['requests']}, "
+                                    f"drifts: {len(cassette_totals['drifts'])}")
+        for drift in cassette_totals["drifts"]:
+            terminalreporter.write_line(f"drift in {drift['nodeid']} on {drift['exchange']}: "
+                                        f"{'; '.join(drift['drifts'])}")
+    if any(response_cache_totals.values()):
+        terminalreporter.write_sep("-", "response cache")
+        terminalreporter.write_line(f"hits: {response_cache_totals['hits']}, "
+                                    f"misses: {response_cache_totals['misses']}, "
+                                    f"bypassed: {response_cache_totals['bypasses']}")
+    if resource_cleanup_totals["deleted"] or resource_cleanup_totals["already_gone"] or \
+            resource_cleanup_totals["leaked"]:
+        terminalreporter.write_sep("-", "resource cleanup")
+        terminalreporter.write_line(f"deleted: {resource_cleanup_totals['deleted']}, "
+                                    f"already gone: {resource_cleanup_totals['already_gone']}, "
+                                    f"leaked: {len(resource_cleanup_totals['leaked'])}")
+        for resource in resource_cleanup_totals["leaked"]:
+            terminalreporter.write_line(f"leaked {resource['kind']} {resource['id']} created by {resource['owner']} "
+                                        f"(status: {resource['status_code']}, error: {resource['error']})")
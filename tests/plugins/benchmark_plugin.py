@@ -0,0 +1,181 @@
+import os.path
+
+import pytest
+
+from src.utilities import api_metrics, benchmarks, utilities
+
+BENCHMARKS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test_benchmarks")
+# Results of every benchmark, collected on the main process
+benchmark_results = {}
+# Recorders of the tests marked with fixture_benchmark, per benchmark name
+fixture_recorders = {}
+
+
+# Adding cmd options to run the framework overhead benchmarks
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true", default=False,
+        help="Run only the framework overhead benchmarks against the local Petstore stub and a fake browser, "
+             "a benchmark fails when it regressed past the saved baseline. ex: --benchmark"
+    )
+    parser.addoption(
+        "--benchmark-save", action="store_true", default=False,
+        help="Save results of the benchmarks as the new baseline instead of comparing them. "
+             "ex: --benchmark --benchmark-save"
+    )
+
+
+# Benchmarks are left out of test runs, benchmark runs leave out tests
+def pytest_ignore_collect(collection_path, config):
+    if not config.getoption("--benchmark") and str(collection_path).startswith(BENCHMARKS_PATH):
+        return True
+
+
+# Runs before pytest-xdist turns xdist_group markers into groups
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(config, items):
+    if not config.getoption("--benchmark"):
+        return
+    deselected = [item for item in items if item.get_closest_marker("benchmark") is None]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if item.get_closest_marker("benchmark") is not None]
+    # Tests of a fixture benchmark make one result, with pytest-xdist they all go to one worker with --dist loadgroup
+    names = []
+    for item in items:
+        marker = item.get_closest_marker("fixture_benchmark")
+        if marker is not None:
+            names.append(marker.args[0])
+            item.add_marker(pytest.mark.xdist_group(marker.args[0]))
+    for name in set(names):
+        fixture_recorders[name] = benchmarks.PhaseRecorder(
+            names.count(name), warmup=utilities.read_int_config("benchmarks", "fixture_warmup"),
+            memory_tests=utilities.read_int_config("benchmarks", "fixture_memory_tests"))
+
+
+# Benchmarks call APIHelper against the in-process Petstore stub so results do not depend on the network
+def pytest_configure(config):
+    config.benchmark_baseline = None
+    if config.getoption("--benchmark"):
+        config.option.petstore = "local"
+        config.benchmark_baseline = benchmarks.read_baseline()
+
+
+# Fixture to measure a framework hot path, the test fails when it regressed past the thresholds of [benchmarks]
+@pytest.fixture(scope="function")
+def benchmark(request):
+    if request.config.benchmark_baseline is None:
+        pytest.skip("Benchmarks run with --benchmark")
+
+    def run(function, iterations=None):
+        result = benchmarks.measure(function,
+                                    iterations=iterations or utilities.read_int_config("benchmarks", "iterations"),
+                                    warmup=utilities.read_int_config("benchmarks", "warmup"),
+                                    memory_iterations=utilities.read_int_config("benchmarks", "memory_iterations"),
+                                    max_seconds=utilities.read_float_config("benchmarks", "max_seconds"))
+        request.node.benchmark_result = result
+        regressions = find_baseline_regressions(request.config, request.node.name, result)
+        if regressions:
+            pytest.fail(f"{request.node.name} regressed: {'; '.join(regressions)}")
+        return result
+    return run
+
+
+# Regressions of a result against the saved baseline, none while saving a new baseline
+def find_baseline_regressions(config, name, result):
+    baseline_result = config.benchmark_baseline.get(name)
+    if baseline_result is None or config.getoption("--benchmark-save"):
+        return []
+    return benchmarks.find_regressions(
+        result, baseline_result,
+        latency_threshold=utilities.read_float_config("benchmarks", "latency_threshold"),
+        memory_threshold=utilities.read_float_config("benchmarks", "memory_threshold"),
+        latency_noise_floor_us=utilities.read_float_config("benchmarks", "latency_noise_floor_us"),
+        memory_noise_floor_kb=utilities.read_float_config("benchmarks", "memory_noise_floor_kb"))
+
+
+def get_fixture_recorder(item):
+    marker = item.get_closest_marker("fixture_benchmark")
+    return fixture_recorders.get(marker.args[0]) if marker is not None else None
+
+
+# Hooks to time the setup and teardown of the real fixtures of tests marked with fixture_benchmark
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    recorder = get_fixture_recorder(item)
+    if recorder is None:
+        yield
+        return
+    item.fixture_sample = recorder.start_test()
+    with recorder.phase(item.fixture_sample):
+        yield
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_teardown(item, nextitem):
+    recorder = get_fixture_recorder(item)
+    sample = getattr(item, "fixture_sample", None)
+    if recorder is None or sample is None:
+        yield
+        return
+    # The last test of the run also tears down the session fixtures, which is not work done for every test
+    if nextitem is None:
+        sample["kind"] = "warmup"
+    with recorder.phase(sample):
+        yield
+    recorder.end_test(sample)
+    if recorder.is_complete():
+        item.benchmark_name = item.get_closest_marker("fixture_benchmark").args[0]
+        item.benchmark_result = recorder.result()
+
+
+# Hook to add the results of each benchmark to the report, fixture benchmarks report on the teardown of their last
+# test and fail it when they regressed
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    pytest_html = item.config.pluginmanager.getplugin('html')
+    outcome = yield
+    report = outcome.get_result()
+    benchmark_result = getattr(item, "benchmark_result", None)
+    if benchmark_result is None:
+        return
+    item.benchmark_result = None
+    name = getattr(item, "benchmark_name", item.name)
+    result_row = {"name": name, **benchmark_result}
+    report.user_properties.append(("benchmark", result_row))
+    extras = getattr(report, 'extras', [])
+    extras.append(pytest_html.extras.html(api_metrics.render_html_table([result_row], benchmarks.RESULT_COLUMNS)))
+    report.extras = extras
+    regressions = find_baseline_regressions(item.config, name, benchmark_result) if report.when == 'teardown' else []
+    if regressions and report.passed:
+        report.outcome = "failed"
+        report.longrepr = f"{name} regressed: {'; '.join(regressions)}"
+
+
+# Collect benchmark results, on the main process when running with pytest-xdist
+def pytest_runtest_logreport(report):
+    for name, value in report.user_properties:
+        if name == "benchmark":
+            benchmark_results[value["name"]] = {key: item for key, item in value.items() if key != "name"}
+
+
+# Export results of the run and save them as the baseline when asked for
+def pytest_sessionfinish(session):
+    if hasattr(session.config, "workerinput") or not benchmark_results:
+        return
+    benchmarks.export_json(benchmark_results, os.path.join(utilities.RESULTS_PATH, "benchmarks.json"))
+    if session.config.getoption("--benchmark-save"):
+        session.config.benchmark_baseline.save(benchmark_results)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not benchmark_results:
+        return
+    terminalreporter.write_sep("-", "framework benchmarks")
+    saved = config.getoption("--benchmark-save")
+    terminalreporter.write_line(benchmarks.format_results(benchmark_results,
+                                                          None if saved else config.benchmark_baseline))
+    if saved:
+        terminalreporter.write_line(f"baseline saved to {config.benchmark_baseline.baseline_file_path}")
+    elif not config.benchmark_baseline.benchmarks:
+        terminalreporter.write_line("no baseline to compare with, save one with --benchmark --benchmark-save")
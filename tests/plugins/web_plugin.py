@@ -0,0 +1,200 @@
+import os.path
+
+import pytest
+
+from src.helpers.WebDriverProfiler import WebDriverProfiler, WebDriverProfileSession, render_html_summary
+from src.utilities import artifacts, settings, utilities
+
+# Selenium and the webdriver managers are imported by the driver_pool fixture, runs without web tests never load them
+webdriver_profile_session = WebDriverProfileSession()
+
+
+# Adding cmd options to control running web test cases
+def pytest_addoption(parser):
+    parser.addoption(
+        "--browser", action="store", default="chrome",
+        help="Select browser to run web tests. ex: --browser edge",
+        choices=("chrome", "firefox", "edge")
+    )
+    parser.addoption(
+        "--headless", action="store_true", default="",
+        help="Select headless mode for web tests. ex: --headless"
+    )
+    parser.addoption(
+        "--profile-webdriver", action="store_true", default=False,
+        help="Record every WebDriver command of web tests and add a profile to the report. ex: --profile-webdriver"
+    )
+
+
+# Fixture to keep a pool of warm browsers for the whole session of each worker
+@pytest.fixture(scope="session")
+def driver_pool(request):
+    from src.helpers.WebDriverHelper import WebDriverPool
+    browser = request.config.getoption("--browser")
+    headless = request.config.getoption("--headless")
+    web_base_url = settings.get_settings().web.web_base_url
+    pool = WebDriverPool(browser, headless, web_base_url,
+                         max_idle=utilities.read_int_config("web", "pool_max_idle"),
+                         max_uses=utilities.read_int_config("web", "pool_max_uses"))
+    yield pool
+    utilities.custom_logger().info(f"WebDriver pool stats: {pool.stats()}")
+    pool.close()
+
+
+# Fixture to hand out a warm browser for each web test case and reset it afterwards
+@pytest.fixture(scope="function")
+def driver(request, driver_pool):
+    # Tests marked with fresh_browser get their own browser process
+    fresh_browser = request.node.get_closest_marker("fresh_browser")
+    driver = driver_pool.launch_fresh() if fresh_browser else driver_pool.acquire()
+    # Tests sharing a browser config are kept on the workers that already have one warm
+    if not fresh_browser:
+        request.node.browser_config = f"{driver_pool.browser}{' headless' if driver_pool.headless else ''}"
+    # Profiling stops before the pool resets the browser so only the test's own commands are recorded
+    profiler = WebDriverProfiler(driver).start() if request.config.getoption("--profile-webdriver") else None
+    request.node.webdriver_profiler = profiler
+    yield driver
+    if profiler is not None:
+        profiler.stop()
+    if fresh_browser:
+        driver.quit()
+    else:
+        driver_pool.release(driver)
+    log_wait_records(request.node.name, driver)
+
+
+# Fixture to run page objects against an in-memory browser, no browser or driver binary is needed
+@pytest.fixture(scope="function")
+def fake_driver(request):
+    from src.helpers.FakeWebDriver import create_fake_driver
+    driver = create_fake_driver(settings.get_settings().web.web_base_url)
+    yield driver
+    driver.quit()
+    log_wait_records(request.node.name, driver)
+
+
+# Fixture to open page objects in the test's browser, they import selenium so they are loaded with the browser
+@pytest.fixture(scope="function")
+def home_page(driver):
+    from src.helpers.WebPagesHelper import HomePage
+    return HomePage(driver)
+
+
+# Fixture to run the rows of data-driven web tests in tabs of one browser, shared by the tests of a module
+@pytest.fixture(scope="module")
+def multi_window_executor():
+    from src.helpers.MultiWindowExecutor import MultiWindowExecutor
+    executor = MultiWindowExecutor(settings.get_settings().web.web_base_url,
+                                   max_windows=utilities.read_int_config("web", "max_windows"),
+                                   page_load_timeout=utilities.read_float_config("web", "page_load_timeout"))
+    yield executor
+    if executor.matrices:
+        utilities.custom_logger().info(f"Multi window executor stats: {executor.stats()}")
+
+
+# Fixture to run the row of a parametrized web test in a browser tab. The first row of the test runs every row
+# collected for it in tabs of its browser, each row then reports its own result. pytest-xdist workers only get
+# every row of a test with --dist loadgroup, otherwise each row runs alone in its own tab
+@pytest.fixture(scope="function")
+def run_in_window(request, driver, multi_window_executor):
+    def run(row_function, start_path="/"):
+        node = request.node
+        if hasattr(request.config, "workerinput") and not request.config.getoption("loadgroup", False):
+            rows = {node.callspec.id: node.callspec.params}
+        else:
+            # Rows of the test collected in this run, deselected rows are left out
+            rows = {item.callspec.id: item.callspec.params for item in request.session.items
+                    if getattr(item, "function", None) is node.function and hasattr(item, "callspec")}
+        result = multi_window_executor.get_result(f"{node.module.__name__}::{node.originalname}", driver,
+                                                  row_function, rows, node.callspec.id, start_path)
+        node.window_row_result = result
+        if result["error"] is not None:
+            raise result["error"]
+    return run
+
+
+# Keep the rows of each multi-window test in one xdist_group, with --dist loadgroup they run on one worker instead
+# of every worker running the whole matrix
+@pytest.hookimpl(tryfirst=True)
+def pytest_collection_modifyitems(items):
+    for item in items:
+        if "run_in_window" in getattr(item, "fixturenames", ()) and item.get_closest_marker("xdist_group") is None:
+            item.add_marker(pytest.mark.xdist_group(f"{item.module.__name__.rpartition('.')[2]}.{item.originalname}"))
+
+
+# Log how long the explicit waits of a web test case took on its driver
+def log_wait_records(test_case_name, driver):
+    from src.helpers import WaitHelper
+    wait_records = WaitHelper.pop_wait_records(driver)
+    if wait_records:
+        total_wait = sum(record["elapsed"] for record in wait_records)
+        slowest_wait = max(wait_records, key=lambda record: record["elapsed"])
+        utilities.custom_logger().info(f"Test case: {test_case_name} waited {total_wait:.2f}s in "
+                                       f"{len(wait_records)} waits, slowest: {slowest_wait}")
+
+
+# Hook to add WebDriver profile and failure artifacts of each web test to the report
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    pytest_html = item.config.pluginmanager.getplugin('html')
+    outcome = yield
+    report = outcome.get_result()
+    extras = getattr(report, 'extras', [])
+    # Attach the WebDriver command profile of the test, pytest-html only shows extras of the call phase
+    webdriver_profiler = getattr(item, "webdriver_profiler", None)
+    if report.when == 'call' and webdriver_profiler is not None:
+        webdriver_profile = webdriver_profiler.stop()
+        report.user_properties.append(("webdriver_profile", webdriver_profile))
+        extras.append(pytest_html.extras.html(render_html_summary(webdriver_profile)))
+    browser_config = getattr(item, "browser_config", None)
+    if report.when == 'teardown' and browser_config is not None:
+        report.user_properties.append(("browser_config", browser_config))
+    # Rows run in a browser tab link the artifacts captured in their own tab
+    window_row_result = getattr(item, "window_row_result", None)
+    if report.when == 'call' and window_row_result is not None:
+        # The call of the first row runs the whole matrix, each row is timed on its own for the duration store
+        report.user_properties.append(("window_row_elapsed", window_row_result["elapsed"]))
+        extras.append(pytest_html.extras.html(f"<div>Ran in browser tab {window_row_result['window']} in "
+                                              f"{window_row_result['elapsed']}s</div>"))
+        for name, artifact_path in window_row_result["artifacts"]:
+            extras.append(pytest_html.extras.url(artifact_path, name=name))
+    # Capture artifacts from the failing test's own driver, they are written in the background and linked
+    elif report.when == 'call':
+        xfail = hasattr(report, 'wasxfail')
+        test_driver = item.funcargs.get("driver") if hasattr(item, "funcargs") else None
+        if test_driver is not None and ((report.skipped and xfail) or (report.failed and not xfail)):
+            from src.helpers.WebDriverHelper import capture_failure_artifacts
+            for name, artifact_path in capture_failure_artifacts(test_driver, artifacts.get_artifact_writer()):
+                extras.append(pytest_html.extras.url(artifact_path, name=name))
+    report.extras = extras
+
+
+# Collect WebDriver profiles, on the main process when running with pytest-xdist
+def pytest_runtest_logreport(report):
+    for name, value in report.user_properties:
+        if name == "webdriver_profile":
+            webdriver_profile_session.add_test_profile(value)
+
+
+# Remove artifacts of a previous run before the workers start, artifacts are linked from the --html report
+def pytest_configure(config):
+    if getattr(config.option, "htmlpath", None):
+        artifacts.set_report_path(config.option.htmlpath)
+    if not hasattr(config, "workerinput"):
+        artifacts.remove_artifacts()
+
+
+# Flush failure artifacts of this worker and export the WebDriver profile
+def pytest_sessionfinish(session):
+    # Failure artifacts still queued are written before the report links to them
+    artifact_writer = artifacts.get_existing_artifact_writer()
+    if artifact_writer is not None:
+        artifact_writer.close()
+        utilities.custom_logger().info(f"Failure artifacts stats: {artifact_writer.stats()}")
+    if not hasattr(session.config, "workerinput") and webdriver_profile_session.folded:
+        webdriver_profile_session.export_folded(os.path.join(utilities.RESULTS_PATH, "webdriver_profile.folded"))
+
+
+def pytest_html_results_summary(prefix, summary, postfix, session):
+    if webdriver_profile_session.folded:
+        postfix.append(webdriver_profile_session.render_html_summary())
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+from jsonschema.exceptions import ValidationError
+
+from src.utilities import utilities
+from src.helpers.APIHelper import APIHelper
+from src.helpers.AsyncAPIHelper import AsyncAPIHelper
+
+# API helpers run against the in-process Petstore stub, started with --petstore local
+pytestmark = [pytest.mark.api, pytest.mark.regression]
+
+logger = utilities.custom_logger()
+
+
+def test_stream_rejects_invalid_pet_after_first(local_petstore):
+    api_helper = APIHelper()
+    valid_pets = list(api_helper.iter_pets_by_status("sold", 200))
+    assert valid_pets
+    logger.info(f"Add a pet with a number as name after the {len(valid_pets)} sold pets of the stub")
+    invalid_pet = local_petstore.state.add_pet({"name": 12345, "status": "sold"})
+    try:
+        logger.warning(f"Check streaming the sold pets fails on the invalid pet at index {len(valid_pets)}")
+        with pytest.raises(ValidationError):
+            list(api_helper.iter_pets_by_status("sold", 200))
+    finally:
+        local_petstore.state.delete_pet(invalid_pet["id"])
+
+
+# Slow the stub down so concurrent requests overlap and finish out of order
+@pytest.fixture(scope="function")
+def slow_petstore(local_petstore):
+    local_petstore.latency_ms, local_petstore.latency_jitter_ms = 10, 20
+    yield local_petstore
+    local_petstore.latency_ms, local_petstore.latency_jitter_ms = 0, 0
+
+
+def test_batch_results_in_input_order(slow_petstore):
+    async_api_helper = AsyncAPIHelper()
+    pet_payloads = [async_api_helper.generate_random_date("pet_payload") for _ in range(8)]
+    logger.info(f"Add {len(pet_payloads)} pets concurrently")
+    added_pets = async_api_helper.run(async_api_helper.add_pets(pet_payloads, 200))[0]
+    assert [pet["name"] for pet in added_pets] == [payload["name"] for payload in pet_payloads]
+
+    pet_ids = [pet["id"] for pet in reversed(added_pets)]
+    order_payloads = [async_api_helper.generate_random_date("order_payload", pet_id=pet_id) for pet_id in pet_ids]
+    logger.info(f"Read the pets in reverse order and place an order for each: {pet_ids}")
+    read_pets, placed_orders = async_api_helper.run(async_api_helper.get_pets_by_ids(pet_ids, 200),
+                                                    async_api_helper.place_orders(order_payloads, 200))
+    order_ids = [order["id"] for order in placed_orders]
+    read_orders = async_api_helper.run(async_api_helper.get_orders_by_ids(order_ids, 200))[0]
+
+    logger.warning("Check every batch returned its results in input order")
+    assert [pet["id"] for pet in read_pets] == pet_ids
+    assert [order["petId"] for order in placed_orders] == pet_ids
+    assert [order["id"] for order in read_orders] == order_ids
+    async_api_helper.run(async_api_helper.delete_pets(pet_ids, 200))
+
+
+def test_batch_concurrency_is_bounded(slow_petstore):
+    api_helper = APIHelper()
+    async_api_helper = AsyncAPIHelper(api_helper)
+    max_concurrency = utilities.read_int_config("async_api", "max_concurrency")
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+    get_pet_by_id = api_helper.get_pet_by_id
+
+    def counted_get_pet_by_id(pet_id, expected_status_code):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        try:
+            return get_pet_by_id(pet_id, expected_status_code)
+        finally:
+            with lock:
+                in_flight["now"] -= 1
+
+    api_helper.get_pet_by_id = counted_get_pet_by_id
+    pet_ids = [pet["id"] for pet in api_helper.get_pets_by_status("available", 200)] * 3 * max_concurrency
+    logger.info(f"Read {len(pet_ids)} pets with max_concurrency {max_concurrency}")
+    async_api_helper.run(async_api_helper.get_pets_by_ids(pet_ids, 200))
+
+    logger.warning(f"Check at most {max_concurrency} requests were in flight, max seen: {in_flight['max']}")
+    assert 1 < in_flight["max"] <= max_concurrency
+
+
+def test_batch_failure_is_raised(local_petstore):
+    async_api_helper = AsyncAPIHelper()
+    available_pet_id = async_api_helper.api_helper.get_pets_by_status("available", 200)[0]["id"]
+    missing_pet_id = max(local_petstore.state.pets) + 1000
+    logger.warning(f"Check reading pets {available_pet_id} and missing {missing_pet_id} expecting 200 raises")
+    with pytest.raises(AssertionError):
+        async_api_helper.run(async_api_helper.get_pets_by_ids([available_pet_id, missing_pet_id], 200))
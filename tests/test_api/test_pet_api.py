@@ -1,10 +1,10 @@
 import random
-import time
 
 import pytest
 
 from src.utilities import utilities
 from src.helpers.APIHelper import APIHelper
+from src.helpers.AsyncAPIHelper import AsyncAPIHelper
 
 pytestmark = [pytest.mark.api, pytest.mark.regression]
 
@@ -13,11 +13,8 @@ logger = utilities.custom_logger()
 
 def test_update_existing_pet():
     api_helper = APIHelper()
-    logger.info("Get list of all pets with status available")
-    available_pets_json = api_helper.get_pets_by_status("available", 200)
-
-    logger.info("Select random pet from retrieved list")
-    random_pet = random.choice([pet for pet in available_pets_json])
+    logger.info("Stream list of all pets with status available and select a random pet from it")
+    random_pet = api_helper.sample_pets_by_status("available", 1, 200)[0]
     logger.info(f"Selected random pet: {random_pet}")
 
     random_pet["name"] = api_helper.generate_random_date("pet_name")
@@ -47,23 +44,26 @@ def test_place_order():
 
 def test_update_inventory():
     api_helper = APIHelper()
-    logger.info("Get list of all pets with status available")
-    available_pets_json = api_helper.get_pets_by_status("available", 200)
+    async_api_helper = AsyncAPIHelper(api_helper)
+    logger.info("Get list of all pets with status available and inventory data concurrently")
+    available_pets_json, inventory_before_update = async_api_helper.run(
+        async_api_helper.get_pets_by_status("available", 200),
+        async_api_helper.get_inventory(200))
 
     logger.info("Select random pet from retrieved list")
     random_pet = random.choice([pet for pet in available_pets_json])
     logger.info(f"Selected random pet: {random_pet}")
-
-    inventory_before_update = api_helper.get_inventory(200)
     logger.info(f"Inventory data before update: {inventory_before_update}")
 
     random_pet["status"] = "pending"
     logger.info("Update retrieved pet data with status: pending")
     api_helper.post_update_pet_by_id(random_pet["id"], random_pet["name"], random_pet["status"], 200)
 
-    # Wait for the inventory to be updated
-    time.sleep(1)
-    inventory_after_update = api_helper.get_inventory(200)
+    # Poll until the inventory reflects the update instead of sleeping a fixed time
+    inventory_after_update = api_helper.poll_until(
+        lambda: api_helper.get_inventory(200),
+        lambda inventory: inventory["pending"] - inventory_before_update["pending"] == 1,
+        description="inventory pending count increased by 1")
     logger.info(f"Inventory data before update: {inventory_after_update}")
     logger.warning("Check inventory data updated correctly")
     assert inventory_before_update["available"] - inventory_after_update["available"] == 1
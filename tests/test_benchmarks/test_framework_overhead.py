@@ -0,0 +1,53 @@
+import pytest
+
+from src.helpers.APIHelper import APIHelper
+from src.helpers.WebPagesHelper import HomePage
+from src.utilities import utilities
+from src.utilities.schema_registry import get_schema_registry
+from tests.test_web.test_ui_playground import check_sample_app_login
+
+pytestmark = [pytest.mark.benchmark]
+
+LARGE_LIST_SIZE = 1000
+
+
+def test_api_helper_construction(benchmark):
+    benchmark(APIHelper)
+
+
+# get_pets_schema describes its items as a list, so each pet is checked against the schema of the first item
+def test_pet_schema_large_list(benchmark):
+    validate_pet = get_schema_registry().get_item_validator("get_pets_schema")
+    pets = [{"id": index, "category": {"id": 1, "name": "dogs"}, "name": f"pet-{index}",
+             "photoUrls": [f"https://example.com/pets/{index}.png"], "tags": [{"id": 1, "name": "stub"}],
+             "status": "available"} for index in range(LARGE_LIST_SIZE)]
+    benchmark(lambda: [validate_pet(pet, 0) for pet in pets])
+
+
+def test_custom_logger(benchmark):
+    benchmark(utilities.custom_logger)
+
+
+# Trivial tests, the benchmark plugin times the setup and teardown of the real autouse fixtures around each of them
+@pytest.mark.fixture_benchmark("test_api_test_fixtures")
+@pytest.mark.parametrize("row", range(utilities.read_int_config("benchmarks", "fixture_tests")))
+def test_api_test_fixtures(row):
+    pass
+
+
+def test_get_pet_by_id_from_stub(benchmark):
+    api_helper = APIHelper()
+    benchmark(lambda: api_helper.get_pet_by_id(1, 200))
+
+
+def test_home_page_construction(benchmark, fake_driver):
+    benchmark(lambda: HomePage(fake_driver))
+
+
+def test_sample_app_login_row(benchmark, fake_driver):
+    sample_app_url = fake_driver.current_url.rstrip("/") + "/sampleapp"
+
+    def log_in_and_out():
+        fake_driver.get(sample_app_url)
+        check_sample_app_login(fake_driver, "test_user", "pwd", True)
+    benchmark(log_in_and_out, iterations=50)
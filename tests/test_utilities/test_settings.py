@@ -0,0 +1,33 @@
+from configparser import ConfigParser
+
+import pytest
+
+from src.utilities import settings, utilities
+
+pytestmark = [pytest.mark.regression]
+
+logger = utilities.custom_logger()
+
+
+def test_profile_section_overrides_base_section(monkeypatch):
+    for option in ("web_base_url", "explicit_wait", "page_load_timeout"):
+        monkeypatch.delenv(f"WEB__{option}".upper(), raising=False)
+    config = ConfigParser()
+    config.read(settings.CONFIG_FILE_PATH)
+    settings_store = settings.SettingsStore()
+
+    logger.info("Select the ci profile")
+    settings_store.select_profile("ci")
+    web_settings = settings_store.get().section("web")
+
+    logger.warning("Check [web:ci] options win and the other ones come from [web]")
+    assert settings_store.get().profile == "ci"
+    assert web_settings.get_float("explicit_wait") == config.getfloat("web:ci", "explicit_wait")
+    assert web_settings.get_float("explicit_wait") != config.getfloat("web", "explicit_wait")
+    assert web_settings.get_float("page_load_timeout") == config.getfloat("web:ci", "page_load_timeout")
+    assert web_settings["web_base_url"] == config.get("web", "web_base_url")
+    assert settings_store.get().web.web_base_url == config.get("web", "web_base_url")
+
+    logger.warning("Check the local profile keeps the [web] options")
+    settings_store.select_profile("local")
+    assert settings_store.get().section("web").get_float("explicit_wait") == config.getfloat("web", "explicit_wait")
@@ -0,0 +1,35 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from src.utilities import utilities
+from src.utilities.artifacts import ArtifactWriter
+
+# Failure artifacts are written to a temporary folder, no browser is needed
+pytestmark = [pytest.mark.web, pytest.mark.regression]
+
+logger = utilities.custom_logger()
+
+
+def test_screenshot_downscaled_to_jpeg(tmp_path):
+    png = io.BytesIO()
+    Image.new("RGB", (2560, 1440), "white").save(png, "PNG")
+    screenshot_base64 = base64.b64encode(png.getvalue()).decode()
+    artifact_writer = ArtifactWriter(artifacts_path=str(tmp_path), max_width=1280, jpeg_quality=70,
+                                     report_directory=str(tmp_path.parent))
+
+    logger.info("Submit the same 2560x1440 screenshot twice")
+    artifact_path = artifact_writer.submit_screenshot(screenshot_base64)
+    assert artifact_writer.submit_screenshot(screenshot_base64) == artifact_path
+    artifact_writer.close()
+
+    logger.warning("Check screenshot is written once as a 1280x720 jpeg linked from the report folder")
+    assert artifact_path == f"{tmp_path.name}/{artifact_path.rsplit('/', 1)[1]}"
+    assert artifact_path.endswith(".jpg")
+    with Image.open(tmp_path / artifact_path.rsplit("/", 1)[1]) as screenshot:
+        assert screenshot.format == "JPEG"
+        assert screenshot.size == (1280, 720)
+    assert artifact_writer.stats()["written"] == 1
+    assert artifact_writer.stats()["deduplicated"] == 1
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from src.utilities import utilities
+
+# Page objects run against the in-memory browser of src/helpers/FakeWebDriver.py, no browser is needed
+pytestmark = [pytest.mark.web, pytest.mark.regression]
+
+logger = utilities.custom_logger()
+
+
+def test_cached_element_recovers_after_reload(fake_driver):
+    from src.helpers.WebPagesHelper import ClickPage
+    fake_driver.get(fake_driver.current_url.rstrip("/") + "/click")
+    click_page = ClickPage(fake_driver)
+    bad_button = click_page.page_factory.get_element(click_page.bad_button)
+    expected_bad_button_class = click_page.get_bad_button_class_attribute()
+
+    logger.info("Reload the page so the cached button handle is stale")
+    fake_driver.get(fake_driver.current_url)
+
+    logger.warning("Check script based and command based reads recover the cached button")
+    assert click_page.get_bad_button_class_attribute() == expected_bad_button_class
+    fake_driver.get(fake_driver.current_url)
+    assert bad_button.get_attribute("id") == "badButton"
+    fake_driver.get(fake_driver.current_url)
+    assert bad_button.is_displayed()
+    fake_driver.get(fake_driver.current_url)
+    assert bad_button.get_dom_attribute("class") == expected_bad_button_class
+    fake_driver.get(fake_driver.current_url)
+    assert bad_button.text == "Button That Ignores DOM Click Event"
+
+
+def test_table_recovers_after_reload(fake_driver):
+    from src.helpers.WebPagesHelper import DynamicTablePage
+    fake_driver.get(fake_driver.current_url.rstrip("/") + "/dynamictable")
+    dynamic_table_page = DynamicTablePage(fake_driver)
+    expected_chrome_cpu_value = dynamic_table_page.get_chrome_cpu_value_from_label()
+    dynamic_table_page.get_chrome_cpu_value_from_table()
+
+    logger.info("Reload the page so the cached table handle is stale")
+    fake_driver.get(fake_driver.current_url)
+
+    logger.warning(f"Check value read from the reloaded table is: {expected_chrome_cpu_value}")
+    assert dynamic_table_page.get_chrome_cpu_value_from_table() == expected_chrome_cpu_value
+
+
+def test_absence_check_uses_absence_wait(fake_driver):
+    from selenium.webdriver.common.by import By
+    from src.helpers import WaitHelper
+    from src.helpers.WebPagesHelper import PageFactory
+    page_factory = PageFactory(fake_driver)
+    WaitHelper.pop_wait_records(fake_driver)
+    absence_timeout = utilities.read_float_config("web", "absence_wait")
+
+    logger.info("Check for an element the home page does not have")
+    started = time.perf_counter()
+    assert not page_factory.is_element_present((By.ID, "missing"))
+    elapsed = time.perf_counter() - started
+    assert page_factory.is_element_present((By.LINK_TEXT, "Click"))
+
+    logger.warning(f"Check absence check gave up after {absence_timeout}s instead of the explicit wait")
+    assert elapsed < utilities.read_float_config("web", "explicit_wait")
+    wait_records = WaitHelper.pop_wait_records(fake_driver)
+    assert [(record["timeout"], record["timed_out"]) for record in wait_records] == [(absence_timeout, True),
+                                                                                     (absence_timeout, False)]
+    assert WaitHelper.pop_wait_records(fake_driver) == []
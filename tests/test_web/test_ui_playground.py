@@ -1,6 +1,5 @@
 import pytest
 
-from src.helpers.WebPagesHelper import HomePage
 from src.utilities import utilities
 
 pytestmark = [pytest.mark.usefixtures("driver"), pytest.mark.web, pytest.mark.regression]
@@ -8,9 +7,9 @@ pytestmark = [pytest.mark.usefixtures("driver"), pytest.mark.web, pytest.mark.re
 logger = utilities.custom_logger()
 
 
-def test_class_attribute(driver):
+def test_class_attribute(home_page):
     logger.info("Navigate to Class Attribute page")
-    class_attribute_page = HomePage(driver).go_to_class_attribute_page()
+    class_attribute_page = home_page.go_to_class_attribute_page()
 
     logger.info("Click on primary button using class css selector")
     class_attribute_page.click_on_primary_button()
@@ -24,9 +23,9 @@ def test_class_attribute(driver):
     assert actual_alert_text == expected_alert_text
 
 
-def test_click(driver):
+def test_click(home_page):
     logger.info("Navigate to Click page")
-    click_page = HomePage(driver).go_to_click_page()
+    click_page = home_page.go_to_click_page()
     expected_bad_button_class_before_click = "btn-primary"
     actual_bad_button_class_before_click = click_page.get_bad_button_class_attribute()
 
@@ -49,9 +48,9 @@ def test_click(driver):
     assert expected_bad_button_class_after_click in actual_bad_button_class_after_physical_click
 
 
-def test_dynamic_table(driver):
+def test_dynamic_table(home_page):
     logger.info("Navigate to Dynamic Table page")
-    dynamic_table_page = HomePage(driver).go_to_dynamic_table_page()
+    dynamic_table_page = home_page.go_to_dynamic_table_page()
 
     logger.info("Read chrome cpu value from label")
     expected_chrome_cpu_value = dynamic_table_page.get_chrome_cpu_value_from_label()
@@ -64,10 +63,16 @@ def test_dynamic_table(driver):
     assert actual_chrome_cpu_value == expected_chrome_cpu_value
 
 
+# Rows run in tabs of one browser, each row is still reported as its own test
 @pytest.mark.parametrize("username, password, valid", utilities.read_web_login_test_data())
-def test_sample_app(driver, username, password, valid):
-    logger.info("Navigate to Sample App page")
-    sample_app_page = HomePage(driver).go_to_sample_app_page()
+def test_sample_app(run_in_window, username, password, valid):
+    run_in_window(check_sample_app_login, "/sampleapp")
+
+
+# Login and logout of one row, it starts on the Sample App page opened in its own tab
+def check_sample_app_login(driver, username, password, valid):
+    from src.helpers.WebPagesHelper import SampleAppPage
+    sample_app_page = SampleAppPage(driver)
 
     logger.info(f"Login using username: {username}, password: {password}")
     sample_app_page.type_user_name_and_password(username, password)